@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Measure the Python heap taken by the :class:`~gatenlphiltlab.Annotation` and
+:class:`~gatenlphiltlab.Feature` objects of a corpus of GATE XML documents,
+in bytes per annotation. The lxml trees themselves live outside the Python
+heap and are not counted. With *--baseline*, the corpus is measured again
+with those classes rebuilt without their slots and with nothing interned,
+for comparison.
+
+    python benchmarks/annotation_memory.py path/to/corpus --baseline
+"""
+
+import argparse
+import gc
+import tracemalloc
+import types
+
+import gatenlphiltlab
+from gatenlphiltlab.corpus import Corpus
+
+
+def remove_slots(cls):
+    # the same class with an instance dictionary instead of slots
+    namespace = {
+        name: value
+        for name, value in vars(cls).items()
+        if name not in ("__slots__", "__dict__", "__weakref__")
+        and not isinstance(value, types.MemberDescriptorType)
+    }
+    return type(cls.__name__, cls.__bases__, namespace)
+
+def measure(filenames,
+            columnar):
+    annotation_files = [
+        gatenlphiltlab.AnnotationFile(filename, columnar=columnar)
+        for filename in filenames
+    ]
+    for annotation_file in annotation_files:
+        # leave out the text and nodes, which are not per annotation
+        annotation_file.text
+
+    gc.collect()
+    tracemalloc.start()
+    annotations = []
+    for annotation_file in annotation_files:
+        annotations.extend(annotation_file.annotations)
+    gc.collect()
+    annotations_bytes = tracemalloc.get_traced_memory()[0]
+    features = 0
+    for annotation in annotations:
+        features += len(annotation.features)
+    gc.collect()
+    total_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (
+        len(annotations),
+        features,
+        annotations_bytes / len(annotations),
+        total_bytes / len(annotations),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="sample",
+        help="a directory of GATE XML documents, or a glob pattern",
+    )
+    parser.add_argument("--pattern", default="**/*.xml")
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="load the documents with the columnar annotation store",
+    )
+    parser.add_argument(
+        "--baseline",
+        action="store_true",
+        help="also measure without slots or interning",
+    )
+    args = parser.parse_args()
+
+    filenames = Corpus(args.source, pattern=args.pattern).filenames
+    results = { "current": measure(filenames, args.columnar) }
+    if args.baseline:
+        for name in ("Annotation", "AnnotationSet", "Feature"):
+            setattr(
+                gatenlphiltlab,
+                name,
+                remove_slots(getattr(gatenlphiltlab, name)),
+            )
+        gatenlphiltlab._intern = lambda string: string
+        results["baseline"] = measure(filenames, args.columnar)
+
+    annotations, features = results["current"][:2]
+    print(
+        "{} documents, {} annotations, {} features".format(
+            len(filenames),
+            annotations,
+            features,
+        )
+    )
+    print("bytes per annotation")
+    print("{:>28}".format("") + "".join(
+        "{:>12}".format(name) for name in results
+    ))
+    for i, label in enumerate(("annotations", "annotations and features")):
+        print("{:>28}".format(label) + "".join(
+            "{:>12.1f}".format(result[2 + i]) for result in results.values()
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare the time taken to load a GATE XML document stored uncompressed,
+gzip-compressed, and xz-compressed, both read straight from the decompressor
+by :class:`gatenlphiltlab.AnnotationFile` and, as before, decompressed into a
+temporary file first. The smaller compressed files pay off when reading is
+bound by I/O, e.g. on network storage; run the benchmark where the documents
+actually live to see the effect, as the local page cache hides it.
+
+    python benchmarks/compressed_load.py path/to/document.xml
+"""
+
+import argparse
+import gc
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import time
+
+import gatenlphiltlab
+
+
+def load_via_temp_file(filename,
+                       **options):
+    with gatenlphiltlab.open_document(filename) as xml_file:
+        with tempfile.NamedTemporaryFile(suffix=".xml") as temp_file:
+            shutil.copyfileobj(xml_file, temp_file)
+            temp_file.flush()
+            annotation_file = gatenlphiltlab.AnnotationFile(
+                temp_file.name,
+                **options
+            )
+            annotation_file.annotations
+    return annotation_file
+
+def load(filename,
+         **options):
+    annotation_file = gatenlphiltlab.AnnotationFile(filename, **options)
+    annotation_file.annotations
+    return annotation_file
+
+def time_load(function,
+              filename,
+              repeat,
+              **options):
+    best = None
+    for _ in range(repeat):
+        # don't charge this run for the garbage of the previous ones
+        gc.collect()
+        start = time.perf_counter()
+        function(filename, **options)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("document")
+    parser.add_argument(
+        "--directory",
+        help="where to write the compressed copies, by default a temporary directory",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.document, "rb") as document_file:
+        data = document_file.read()
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        filenames = []
+        for suffix, compress in (
+            ("", lambda data: data),
+            (".gz", gzip.compress),
+            (".xz", lzma.compress),
+        ):
+            filename = os.path.join(directory, "document.xml" + suffix)
+            with open(filename, "wb") as document_file:
+                document_file.write(compress(data))
+            filenames.append(filename)
+
+        print("{:>16} {:>10} {:>10} {:>10} {:>10}".format(
+            "", "MB", "direct", "streaming", "temp file"))
+        for filename in filenames:
+            print("{:>16} {:>10.2f} {:>10.4f} {:>10.4f} {:>10}".format(
+                os.path.basename(filename),
+                os.path.getsize(filename) / 1e6,
+                time_load(load, filename, args.repeat),
+                time_load(load, filename, args.repeat, streaming=True),
+                "{:.4f}".format(
+                    time_load(load_via_temp_file, filename, args.repeat)
+                ) if gatenlphiltlab.get_compression(filename) else "",
+            ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare the speed of the diff engines of :mod:`gatenlphiltlab.diff` on
+synthetic transcripts with scattered edits.
+
+    python benchmarks/diff_engines.py --lengths 10000 50000 200000
+"""
+
+import argparse
+import random
+import time
+
+from gatenlphiltlab import diff
+
+
+WORDS = (
+    "i you we they it that this what yeah okay so well um uh like know "
+    "think mean really just about going feel said told time thing good "
+    "right work home family today yesterday always never maybe because"
+).split()
+
+
+def make_transcript(length,
+                    rng):
+    lines = []
+    size = 0
+    while size < length:
+        speaker = rng.choice(("Therapist", "Client"))
+        words = [ rng.choice(WORDS) for _ in range(rng.randint(3, 25)) ]
+        line = "{}: {}.\n".format(speaker, " ".join(words))
+        lines.append(line)
+        size += len(line)
+    return "".join(lines)[:length]
+
+def edit_transcript(text,
+                    edits,
+                    rng):
+    text = list(text)
+    for _ in range(edits):
+        position = rng.randrange(len(text))
+        operation = rng.random()
+        if operation < 0.4:
+            text[position:position + rng.randint(1, 10)] = rng.choice(WORDS)
+        elif operation < 0.7:
+            text[position:position] = " " + rng.choice(WORDS)
+        else:
+            del text[position:position + rng.randint(1, 20)]
+    return "".join(text)
+
+def check_blocks(text1,
+                 text2,
+                 blocks):
+    matched = 0
+    end1 = end2 = 0
+    for a, b, size in blocks[:-1]:
+        assert a >= end1 and b >= end2
+        assert text1[a:a + size] == text2[b:b + size]
+        end1, end2 = a + size, b + size
+        matched += size
+    assert tuple(blocks[-1]) == (len(text1), len(text2), 0)
+    return matched
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=[5000, 20000, 200000],
+    )
+    parser.add_argument(
+        "--edits-per-10k",
+        type=int,
+        default=20,
+    )
+    parser.add_argument(
+        "--difflib-max-length",
+        type=int,
+        default=20000,
+        help="skip the difflib engine on longer texts, as it takes minutes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print("{:>8} {:>8} {:>10} {:>10} {:>10}".format(
+        "length", "engine", "seconds", "matched", "blocks"))
+    for length in args.lengths:
+        text1 = make_transcript(length, rng)
+        text2 = edit_transcript(
+            text1,
+            max(1, length * args.edits_per_10k // 10000),
+            rng,
+        )
+        for engine in sorted(diff.engines):
+            if engine == "difflib" and length > args.difflib_max_length:
+                continue
+            start = time.perf_counter()
+            blocks = diff.get_matching_blocks(text1, text2, engine)
+            seconds = time.perf_counter() - start
+            matched = check_blocks(text1, text2, blocks)
+            print("{:>8} {:>8} {:>10.3f} {:>10} {:>10}".format(
+                length, engine, seconds, matched, len(blocks)))
+
+if __name__ == "__main__":
+    main()
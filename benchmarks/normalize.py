@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare applying the regexes of :mod:`gatenlphiltlab.regex_patterns` one
+after the other, as :func:`gatenlphiltlab.normalize` used to, with the
+compiled :class:`~gatenlphiltlab.normalization.Normalizer`, over the texts of
+a corpus of GATE XML documents.
+
+    python benchmarks/normalize.py path/to/corpus
+"""
+
+import argparse
+import time
+
+import gatenlphiltlab
+from gatenlphiltlab import normalization
+from gatenlphiltlab import regex_patterns
+from gatenlphiltlab.corpus import Corpus
+
+
+def normalize_sequentially(text):
+    for regex in regex_patterns.regexes:
+        text = regex.expression.sub(regex.replacement, text)
+    return text
+
+def time_calls(function,
+               texts,
+               repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [ function(text) for text in texts ]
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="sample",
+        help="a directory of GATE XML documents, or a glob pattern",
+    )
+    parser.add_argument("--pattern", default="**/*.xml")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [
+        annotation_file.text
+        for annotation_file in Corpus(args.source, pattern=args.pattern)
+    ]
+    normalizer = normalization.get_normalizer()
+    print(
+        "{} documents, {} characters, {}".format(
+            len(texts),
+            sum(len(text) for text in texts),
+            normalizer,
+        )
+    )
+
+    sequential_seconds, expected = time_calls(
+        normalize_sequentially,
+        texts,
+        args.repeat,
+    )
+    compiled_seconds, results = time_calls(
+        gatenlphiltlab.normalize,
+        texts,
+        args.repeat,
+    )
+    assert results == expected
+    tracked_seconds, results = time_calls(
+        lambda text: normalizer.normalize(text, track_offsets=True)[0],
+        texts,
+        args.repeat,
+    )
+    assert results == expected
+
+    print("{:>24} {:>10}".format("", "seconds"))
+    print("{:>24} {:>10.4f}".format("sequential", sequential_seconds))
+    print("{:>24} {:>10.4f}".format("compiled", compiled_seconds))
+    print("{:>24} {:>10.4f}".format("compiled, track_offsets", tracked_seconds))
+
+if __name__ == "__main__":
+    main()
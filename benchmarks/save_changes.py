@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the throughput of writing a GATE XML document with ``tree.write``,
+as :meth:`gatenlphiltlab.AnnotationFile.save_changes` used to, with the
+streaming serializer that it now uses, with and without pretty printing or
+compression, and for a streaming document whose annotation sets were never
+loaded.
+
+    python benchmarks/save_changes.py path/to/document.xml
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import gatenlphiltlab
+
+
+def write_tree(annotation_file,
+               file_path):
+    annotation_file._load_annotation_sets()
+    annotation_file.tree.write(
+        file_path,
+        pretty_print=True,
+        xml_declaration=True,
+    )
+
+def time_save(save,
+              load,
+              repeat):
+    best = None
+    for _ in range(repeat):
+        annotation_file = load()
+        start = time.perf_counter()
+        save(annotation_file)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("document")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    size = os.path.getsize(args.document)
+    print("{}, {:.1f} MB".format(args.document, size / 1e6))
+
+    def load():
+        return gatenlphiltlab.AnnotationFile(args.document)
+
+    def load_streaming():
+        return gatenlphiltlab.AnnotationFile(args.document, streaming=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "output.xml")
+        runs = [
+            (
+                "tree.write",
+                lambda annotation_file: write_tree(annotation_file, output),
+                load,
+            ),
+            (
+                "save_changes",
+                lambda annotation_file: annotation_file.save_changes(output),
+                load,
+            ),
+            (
+                "save_changes, no pretty",
+                lambda annotation_file: annotation_file.save_changes(
+                    output,
+                    pretty_print=False,
+                ),
+                load,
+            ),
+            (
+                "save_changes, gzip",
+                lambda annotation_file: annotation_file.save_changes(
+                    output + ".gz",
+                    compress=True,
+                ),
+                load,
+            ),
+            (
+                "streaming, unloaded",
+                lambda annotation_file: annotation_file.save_changes(output),
+                load_streaming,
+            ),
+        ]
+        print("{:>24} {:>10} {:>10}".format("", "seconds", "MB/s"))
+        for name, save, load_file in runs:
+            seconds = time_save(save, load_file, args.repeat)
+            print("{:>24} {:>10.4f} {:>10.1f}".format(
+                name, seconds, size / 1e6 / seconds))
+
+if __name__ == "__main__":
+    main()
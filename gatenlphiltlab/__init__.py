@@ -6,35 +6,116 @@ for natural language processing by providing abstractions of the documents'
 common features.
 """
 
-from functools import reduce
 from collections import OrderedDict
+import collections.abc
 import itertools
+import numbers
+import re
+import os
+import sys
+import gzip
+import lzma
+import shutil
+import tempfile
+from array import array
 from lxml import etree
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 import intervaltree
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from . import diff
 from . import regex_patterns
+from . import corpus
+from . import cache
+from . import normalization
+from . import query
 
 
 class AnnotationFile:
     """
     An abstraction of a GATE annotation XML file.
 
-    :parameter filename: the path to a GATE XML annotation file 
+    :parameter filename: the path to a GATE XML annotation file, which is
+        decompressed on the fly if it is gzip- or xz-compressed
     :type filename: string
+
+    :parameter streaming: (optional). Load the document with a single
+        streaming pass which keeps only the TextWithNodes section in memory.
+        Each annotation set is indexed by its byte range within the file and
+        is only parsed once its contents are first accessed, e.g. through
+        :attr:`~gatenlphiltlab.AnnotationFile.annotation_sets_dict`.
+    :type streaming: bool
+
+    :parameter columnar: (optional). Back each annotation set with an
+        :class:`~gatenlphiltlab.AnnotationColumns` store. Requires numpy.
+    :type columnar: bool
+
+    :parameter static_interval_index: (optional). Use a
+        :class:`~gatenlphiltlab.StaticIntervalIndex` rather than a
+        :class:`~gatenlphiltlab.GateIntervalTree` for
+        :attr:`~gatenlphiltlab.AnnotationFile.interval_tree`. The index is
+        rebuilt on its next use whenever annotations are added.
+    :type static_interval_index: bool
+
+    :parameter cache: (optional). Load the document's text, nodes, and
+        annotation columns from this cache when it holds an entry for the
+        document as it currently is, and otherwise store one after parsing.
+        On a cache hit the XML is only parsed once an element is needed, e.g.
+        for features or to save changes. Implies *columnar*.
+    :type cache: :class:`~gatenlphiltlab.cache.DocumentCache`
+
+    :parameter feature_index: (optional). Maintain a
+        :class:`~gatenlphiltlab.FeatureIndex` of the annotations' feature
+        values as :attr:`~gatenlphiltlab.AnnotationFile.feature_index`, which
+        :meth:`~gatenlphiltlab.AnnotationFile.select` uses for queries on
+        features. The index is built on first use.
+    :type feature_index: bool
     """
-    def __init__(self, filename):
+    def __init__(self,
+                 filename,
+                 streaming=False,
+                 columnar=False,
+                 static_interval_index=False,
+                 cache=None,
+                 feature_index=False):
+        if cache is not None:
+            columnar = True
+        if columnar and numpy is None:
+            raise ImportError("The columnar annotation store requires numpy.")
         self._filename = filename
-        self._tree = etree.parse(self.filename)
-        self._root = self.tree.getroot()
+        self._streaming = streaming
+        self._columnar = columnar
+        self._static_interval_index = static_interval_index
+        self._use_feature_index = feature_index
+        self._feature_index = None
+        self._annotation_set_ranges = {}
+        self._tree = None
+        self._root = None
         self._nodes = None
         self.__nodes_list = []
         self._text_with_nodes = None
+        self._text = None
+        self._cached_annotation_sets = None
+        if cache is not None:
+            cached_document = cache.load(filename)
+            if cached_document is not None:
+                self._text = cached_document.text
+                self.__nodes_list = cached_document.nodes.tolist()
+                self._cached_annotation_sets = cached_document.annotation_sets
+        if self._cached_annotation_sets is None:
+            # without a cache hit, parse up front as usual
+            self.tree
         self._annotation_sets = []
         self._annotation_sets_dict = {}
         self._annotations = []
         self._interval_tree = None
+        self._annotations_by_type = None
+        self._type_interval_trees = {}
+        if cache is not None and self._cached_annotation_sets is None:
+            cache.store(self)
 
     def __repr__(self):
         return "AnnotationFile('{}')".format(self.filename)
@@ -46,11 +127,69 @@ class AnnotationFile:
         """
         return self._filename
 
+    def _stream_parse(self):
+        # Parse the document once, discarding every annotation as soon as it
+        # has been consumed. Each AnnotationSet element is kept as an empty
+        # placeholder which is later replaced by parsing its byte range.
+        # The byte ranges of compressed documents are offsets into their
+        # decompressed streams.
+        with open_document(self.filename) as xml_file:
+            context = etree.iterparse(
+                xml_file,
+                events=("end",),
+                tag=("Annotation", "AnnotationSet"),
+            )
+            for _, element in context:
+                if element.tag == "Annotation":
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                else:
+                    del element[:]
+        tree = context.root.getroottree()
+
+        placeholders = tree.getroot().findall("./AnnotationSet")
+        with open_document(self.filename) as xml_file:
+            byte_ranges = list(iter_annotation_set_ranges(xml_file))
+        if len(byte_ranges) != len(placeholders):
+            # the raw scan disagrees with the parser, so don't trust it
+            return parse_document(self.filename)
+        self._annotation_set_ranges = dict(zip(placeholders, byte_ranges))
+        return tree
+
+    def _load_annotation_set(self,
+                             placeholder):
+        start, end = self._annotation_set_ranges.pop(placeholder)
+        with open_document(self.filename) as xml_file:
+            xml_file.seek(start)
+            annotation_set_xml = xml_file.read(end - start)
+        parser = etree.XMLParser(encoding=self.tree.docinfo.encoding)
+        annotation_set_element = etree.fromstring(annotation_set_xml, parser)
+        annotation_set_element.tail = placeholder.tail
+        self.root.replace(placeholder, annotation_set_element)
+        return annotation_set_element
+
+    def _load_annotation_sets(self):
+        for annotation_set in self.annotation_sets:
+            annotation_set._element
+
+    def _find_annotation_set_element(self,
+                                     annotation_set):
+        # annotation sets loaded from a cache are matched to their elements
+        # by position, which the sets and the document keep in step
+        position = self.annotation_sets.index(annotation_set)
+        return self.root.findall("./AnnotationSet")[position]
+
     @property
     def tree(self):
         """
         :type: `lxml.etree._Element <http://lxml.de/api/lxml.etree._Element-class.html>`_
         """
+        if self._tree is None:
+            if self._streaming:
+                self._tree = self._stream_parse()
+            else:
+                self._tree = parse_document(self.filename)
         return self._tree
 
     @property
@@ -58,6 +197,8 @@ class AnnotationFile:
         """
         :type: `lxml.etree._Element <http://lxml.de/api/lxml.etree._Element-class.html>`_
         """
+        if self._root is None:
+            self._root = self.tree.getroot()
         return self._root
 
     @property
@@ -71,15 +212,21 @@ class AnnotationFile:
         :setter param new_text: the text to replace the current text
         :setter type new_text: string
         """
-        return "".join( self.text_with_nodes.itertext() )
+        if self._text is None:
+            self._text = "".join( self.text_with_nodes.itertext() )
+        return self._text
 
     @text.setter
     def text(self,
              new_text):
-        change_tree = diff.get_change_tree(
+        change_tree = diff.ChangeTree(
             self.text,
             new_text,
         )
+        # any annotation may move, so rebuild the interval indexes on next
+        # use rather than updating them one annotation at a time
+        self._interval_tree = None
+        self._type_interval_trees = {}
         diff.align_annotations(
             self.annotations,
             change_tree,
@@ -89,13 +236,228 @@ class AnnotationFile:
         new_zero_node.set("id", "0")
         new_zero_node.tail = new_text
         self.text_with_nodes.append(new_zero_node)
-        self.nodes.update({ 0 : new_zero_node })
-        self._nodes_list.append(0)
+        self._text = new_text
+        self._nodes = { 0 : new_zero_node }
+        self.__nodes_list = [0]
         diff.assure_nodes(
             self.annotations,
             self,
         )
 
+    def insert_text(self,
+                    offset,
+                    new_text):
+        """
+        Inserts *new_text* at *offset*. See
+        :meth:`~gatenlphiltlab.AnnotationFile.apply_edits`.
+
+        :param offset: The offset at which to insert the text.
+        :type offset: int
+
+        :param new_text: The text to insert.
+        :type new_text: string
+        """
+        self.apply_edits([(offset, offset, new_text)])
+
+    def delete_range(self,
+                     start,
+                     end):
+        """
+        Deletes the text from *start* to *end*. See
+        :meth:`~gatenlphiltlab.AnnotationFile.apply_edits`.
+
+        :param start: The offset at which the text to delete begins.
+        :type start: int
+
+        :param end: The offset at which the text to delete ends.
+        :type end: int
+        """
+        self.apply_edits([(start, end, "")])
+
+    def replace_range(self,
+                      start,
+                      end,
+                      new_text):
+        """
+        Replaces the text from *start* to *end* with *new_text*. See
+        :meth:`~gatenlphiltlab.AnnotationFile.apply_edits`.
+
+        :param start: The offset at which the text to replace begins.
+        :type start: int
+
+        :param end: The offset at which the text to replace ends.
+        :type end: int
+
+        :param new_text: The replacement text.
+        :type new_text: string
+        """
+        self.apply_edits([(start, end, new_text)])
+
+    def apply_edits(self,
+                    edits):
+        """
+        Replaces ranges of the text, shifting the nodes and annotation offsets
+        which follow each range rather than diffing the whole text as the
+        :attr:`~gatenlphiltlab.AnnotationFile.text` setter does. An offset at
+        or after the end of a replaced range moves with the text which
+        follows it, so text inserted at the end of an annotation is included
+        in it, while text inserted at its start is not. An offset within a
+        replaced range moves to the start of the range.
+
+        :param edits: The edits as (start, end, new_text), where *start* and *end* are offsets within the current text. The ranges must not overlap.
+        :type edits: iterable of tuple(int, int, string)
+        """
+        edits = sorted(
+            (
+                (start, end, new_text)
+                for start, end, new_text in edits
+            ),
+            key=lambda edit: edit[:2],
+        )
+        if not edits:
+            return
+        text = self.text
+        previous_end = 0
+        for start, end, _ in edits:
+            if start < previous_end or end < start or end > len(text):
+                raise ValueError(
+                    "Invalid or overlapping edit: {}".format((start, end))
+                )
+            previous_end = end
+
+        edit_starts = [ start for start, _, _ in edits ]
+        edit_ends = [ end for _, end, _ in edits ]
+        # the total change in length of the text before each edit
+        shifts = [0]
+        for start, end, new_text in edits:
+            shifts.append(shifts[-1] + len(new_text) - (end - start))
+
+        def map_offset(offset):
+            i = bisect_right(edit_ends, offset)
+            if i < len(edits) and edit_starts[i] < offset:
+                return edit_starts[i] + shifts[i]
+            return offset + shifts[i]
+
+        pieces = []
+        previous_end = 0
+        for start, end, new_text in edits:
+            pieces.append(text[previous_end:start])
+            pieces.append(new_text)
+            previous_end = end
+        pieces.append(text[previous_end:])
+        new_text = "".join(pieces)
+
+        self._shift_nodes(
+            map_offset,
+            edit_starts,
+            edit_ends,
+            len(text),
+            new_text,
+        )
+        self._text = new_text
+        self._shift_annotations(map_offset, edit_starts[0])
+
+    def _shift_nodes(self,
+                     map_offset,
+                     edit_starts,
+                     edit_ends,
+                     old_length,
+                     new_text):
+        nodes = self.nodes
+        old_offsets = self._nodes_list
+        # nodes before the first edit, and the text between them, don't change
+        first = max(bisect_left(old_offsets, edit_starts[0]) - 1, 0)
+
+        kept = []
+        for old_offset in old_offsets[first:]:
+            element = nodes[old_offset]
+            new_offset = map_offset(old_offset)
+            if kept and kept[-1][1] == new_offset:
+                # the text between this node and the last was deleted
+                element.getparent().remove(element)
+                continue
+            kept.append((old_offset, new_offset, element))
+
+        if first == 0 and (not kept or edit_starts[0] <= kept[0][0]):
+            self.text_with_nodes.text = new_text[:kept[0][1] if kept else None]
+        next_offsets = [ (x[0], x[1]) for x in kept[1:] ]
+        next_offsets.append((old_length, len(new_text)))
+        for (old_offset, new_offset, element), next_offset in zip(
+            kept,
+            next_offsets,
+        ):
+            next_old_offset, next_new_offset = next_offset
+            if new_offset != old_offset:
+                element.set("id", str(new_offset))
+            # rewrite the text of any node an edit reaches
+            i = bisect_left(edit_ends, old_offset)
+            if i < len(edit_starts) and edit_starts[i] <= next_old_offset:
+                element.tail = new_text[new_offset:next_new_offset]
+
+        self._nodes = {
+            offset : nodes[offset]
+            for offset in old_offsets[:first]
+        }
+        self._nodes.update(
+            (new_offset, element)
+            for _, new_offset, element in kept
+        )
+        self.__nodes_list = old_offsets[:first] + [
+            new_offset
+            for _, new_offset, _ in kept
+        ]
+
+    def _shift_annotations(self,
+                           map_offset,
+                           first_edit_start):
+        shifts = []
+        shifted_heads = 0
+        for annotation_set in self.annotation_sets:
+            for annotation in annotation_set.annotations:
+                for span in annotation.spans:
+                    start_node = span.start_node
+                    end_node = span.end_node
+                    if end_node < first_edit_start:
+                        continue
+                    new_start_node = map_offset(start_node)
+                    new_end_node = map_offset(end_node)
+                    if (new_start_node != start_node
+                            or new_end_node != end_node):
+                        is_head = span is annotation
+                        shifts.append(
+                            (span, is_head, new_start_node, new_end_node)
+                        )
+                        shifted_heads += is_head
+
+        if (self._static_interval_index
+                or 4 * shifted_heads > len(self.annotations)):
+            # rebuilding the indexes on next use beats updating so many
+            self._interval_tree = None
+            self._type_interval_trees = {}
+
+        # the offset setters move each head annotation within the interval
+        # trees which are kept
+        for span, _, new_start_node, new_end_node in shifts:
+            span.start_node = new_start_node
+            span.end_node = new_end_node
+        self.insert_nodes(
+            itertools.chain.from_iterable(
+                (new_start_node, new_end_node)
+                for _, _, new_start_node, new_end_node in shifts
+            )
+        )
+
+    def _get_interval_trees_of(self,
+                               annotation):
+        trees = []
+        if self._interval_tree is not None:
+            trees.append(self._interval_tree)
+        for case_sensitive in (True, False):
+            key = _get_type_key(annotation.type, case_sensitive)
+            if key in self._type_interval_trees:
+                trees.append(self._type_interval_trees[key])
+        return trees
+
     @property
     def nodes(self):
         """
@@ -143,14 +505,58 @@ class AnnotationFile:
         )
         new_node_element.tail = new_node_tail
 
-        self.text_with_nodes.insert(
-            self.text_with_nodes.index(left_neighbor_element) + 1,
-            new_node_element,
-        )
+        left_neighbor_element.addnext(new_node_element)
 
         self._nodes_list.insert(left_neighbor_index + 1, offset)
         self.nodes.update({ offset : new_node_element })
 
+    def insert_nodes(self, offsets):
+        """
+        Inserts a node at each of *offsets* which does not already have one,
+        splitting the text of each existing node only once no matter how many
+        new nodes fall within it.
+
+        :param offsets: the offsets at which nodes are to be inserted
+        :type offsets: iterable(int)
+        """
+        new_offsets = sorted(set(offsets).difference(self.nodes))
+        if not new_offsets:
+            return
+        nodes_list = self._nodes_list
+
+        def get_left_neighbor_offset(offset):
+            return nodes_list[bisect_left(nodes_list, offset) - 1]
+
+        for left_neighbor_offset, group in itertools.groupby(
+            new_offsets,
+            key=get_left_neighbor_offset,
+        ):
+            group = list(group)
+            left_neighbor_element = self.nodes[left_neighbor_offset]
+            tail = left_neighbor_element.tail or ""
+            cuts = [
+                offset - left_neighbor_offset
+                for offset in group
+            ]
+            left_neighbor_element.tail = tail[:cuts[0]]
+            previous_element = left_neighbor_element
+            for offset, cut, next_cut in zip(
+                group,
+                cuts,
+                cuts[1:] + [None],
+            ):
+                new_node_element = left_neighbor_element.makeelement(
+                    "Node",
+                    attrib={"id":str(offset)}
+                )
+                new_node_element.tail = tail[cut:next_cut]
+                previous_element.addnext(new_node_element)
+                previous_element = new_node_element
+                self.nodes[offset] = new_node_element
+
+        # both lists are already sorted, so this is a linear merge
+        self.__nodes_list = sorted(nodes_list + new_offsets)
+
     @property
     def text_with_nodes(self):
         """
@@ -186,16 +592,197 @@ class AnnotationFile:
     @property
     def interval_tree(self):
         """
-        See :class:`~gatenlphiltlab.GateIntervalTree`.
+        See :class:`~gatenlphiltlab.GateIntervalTree` and
+        :class:`~gatenlphiltlab.StaticIntervalIndex`.
 
-        :type: :class:`~gatenlphiltlab.GateIntervalTree`
+        :type: :class:`~gatenlphiltlab.GateIntervalTree` or :class:`~gatenlphiltlab.StaticIntervalIndex`
         """
-        if not self._interval_tree:
-            self._interval_tree = GateIntervalTree()
-            for annotation in self.annotations:
-                self._interval_tree.add(annotation)
+        if self._interval_tree is None:
+            self._interval_tree = self._build_interval_tree(self.annotations)
         return self._interval_tree
 
+    @property
+    def feature_index(self):
+        """
+        The inverted index of the feature values of
+        :attr:`~gatenlphiltlab.AnnotationFile.annotations`, or *None* if the
+        annotation file was not loaded with *feature_index* enabled. It is
+        built on first access, with one pass over the XML of each annotation
+        set.
+
+        :type: :class:`~gatenlphiltlab.FeatureIndex`
+        """
+        if self._feature_index is None and self._use_feature_index:
+            self._feature_index = self._build_feature_index()
+        return self._feature_index
+
+    def _build_feature_index(self):
+        feature_index = FeatureIndex()
+        annotations_by_set = {}
+        for annotation in self.annotations:
+            feature_index.add_annotation(annotation, {})
+            annotations_by_set.setdefault(
+                annotation.annotation_set,
+                {},
+            )[annotation._element] = annotation
+        for annotation_set, annotations in annotations_by_set.items():
+            annotation = None
+            name = value = None
+            for element in annotation_set._element.iter(
+                "Annotation",
+                "Feature",
+                "Name",
+                "Value",
+            ):
+                tag = element.tag
+                if tag == "Annotation":
+                    annotation = annotations.get(element)
+                elif annotation is None:
+                    continue
+                elif tag == "Feature":
+                    name = value = None
+                elif tag == "Name":
+                    if name is None:
+                        name = element
+                        if value is not None:
+                            feature_index.add(annotation, name.text, value.text)
+                elif value is None:
+                    value = element
+                    if name is not None:
+                        feature_index.add(annotation, name.text, value.text)
+        return feature_index
+
+    def _build_interval_tree(self,
+                             annotations):
+        if self._static_interval_index:
+            return StaticIntervalIndex(annotations)
+        interval_tree = GateIntervalTree()
+        interval_tree.update(annotations)
+        return interval_tree
+
+    def get_type_interval_tree(self,
+                               annotation_type,
+                               case_sensitive=True):
+        """
+        Like :attr:`~gatenlphiltlab.AnnotationFile.interval_tree`, but holding
+        only the annotations of type *annotation_type*. Each of these indexes
+        is built on first use.
+
+        :param annotation_type: The annotation type.
+        :type annotation_type: string
+
+        :param case_sensitive: Factor case into matching annotation types.
+        :type case_sensitive: (optional) bool
+
+        :type: :class:`~gatenlphiltlab.GateIntervalTree` or :class:`~gatenlphiltlab.StaticIntervalIndex`
+        """
+        key = _get_type_key(annotation_type, case_sensitive)
+        if key not in self._type_interval_trees:
+            self._type_interval_trees[key] = self._build_interval_tree(
+                self._get_annotations_of_type(annotation_type, case_sensitive)
+            )
+        return self._type_interval_trees[key]
+
+    def _get_annotations_of_type(self,
+                                 annotation_type,
+                                 case_sensitive=True):
+        if self._annotations_by_type is None:
+            self._annotations_by_type = {}
+            for annotation in self.annotations:
+                self._annotations_by_type.setdefault(
+                    annotation.type,
+                    [],
+                ).append(annotation)
+        if case_sensitive:
+            return list(self._annotations_by_type.get(annotation_type, []))
+        key = _get_type_key(annotation_type, case_sensitive)
+        return list(
+            itertools.chain.from_iterable(
+                annotations
+                for existing_type, annotations
+                in self._annotations_by_type.items()
+                if _get_type_key(existing_type, case_sensitive) == key
+            )
+        )
+
+    def get_intersecting_pairs_of_types(self,
+                                        annotation_type_a,
+                                        annotation_type_b,
+                                        relation=None,
+                                        case_sensitive=True):
+        """
+        :returns: Every pair of an annotation of type *annotation_type_a* and an annotation of type *annotation_type_b* whose text spans overlap. See :func:`~gatenlphiltlab.get_intersecting_pairs`.
+        :rtype: list(tuple(:class:`~gatenlphiltlab.Annotation`, :class:`~gatenlphiltlab.Annotation`))
+
+        :param annotation_type_a: The type of the first annotation in each pair.
+        :type annotation_type_a: string
+
+        :param annotation_type_b: The type of the second annotation in each pair.
+        :type annotation_type_b: string
+
+        :param relation: (optional). Restrict the pairs to those where the first annotation "contains" the second, is "within" the second, or is "coextensive" with it.
+        :type relation: string
+
+        :param case_sensitive: Factor case into matching annotation types.
+        :type case_sensitive: (optional) bool
+        """
+        return get_intersecting_pairs(
+            self._get_annotations_of_type(annotation_type_a, case_sensitive),
+            self._get_annotations_of_type(annotation_type_b, case_sensitive),
+            relation=relation,
+        )
+
+    def _add_to_type_interval_trees(self,
+                                    annotations):
+        if self._annotations_by_type is None:
+            return
+        for annotation in annotations:
+            self._annotations_by_type.setdefault(
+                annotation.type,
+                [],
+            ).append(annotation)
+            for case_sensitive in (True, False):
+                key = _get_type_key(annotation.type, case_sensitive)
+                if key not in self._type_interval_trees:
+                    continue
+                if self._static_interval_index:
+                    del self._type_interval_trees[key]
+                else:
+                    self._type_interval_trees[key].add(annotation)
+
+    def _detach_from_interval_trees(self,
+                                    annotation):
+        # Take *annotation* out of the interval trees, before its offsets
+        # change, returning those to add it back to afterwards.
+        if self._interval_tree is None and not self._type_interval_trees:
+            return []
+        if (annotation.type.endswith("_continuation")
+                or annotation._element.getparent() is None):
+            # only the head annotations in the document are indexed
+            return []
+        if self._static_interval_index:
+            # the static index can't be modified, so rebuild it on next use
+            self._interval_tree = None
+            for case_sensitive in (True, False):
+                key = _get_type_key(annotation.type, case_sensitive)
+                self._type_interval_trees.pop(key, None)
+            return []
+        trees = self._get_interval_trees_of(annotation)
+        for tree in trees:
+            tree.remove(annotation)
+        return trees
+
+    def _remove_from_indexes(self,
+                             annotation):
+        # the counterpart of add_annotation, for Annotation.delete
+        self._detach_from_interval_trees(annotation)
+        if self._annotations_by_type is not None:
+            annotations = self._annotations_by_type.get(annotation.type)
+            if annotations and annotation in annotations:
+                annotations.remove(annotation)
+        if self._feature_index is not None:
+            self._feature_index.remove_annotation(annotation)
+
     def iter_annotations(self):
         """
         iterates through all annotations in the document
@@ -211,23 +798,185 @@ class AnnotationFile:
         for annotation in annotations:
             yield annotation
 
+    def select(self,
+               type=None,
+               set=None,
+               features=None,
+               within=None,
+               case_sensitive=True):
+        """
+        Lazily iterate through the annotations which meet every given
+        criterion, using whichever index is cheapest. See
+        :func:`gatenlphiltlab.query.select`, e.g.
+        ``annotation_file.select(type="Event", set="Consensus",
+        features={"Polarity": "neg"}, within=(0, 100))``.
+
+        :rtype: iterator of :class:`~gatenlphiltlab.Annotation`
+        """
+        return query.select(
+            self,
+            type=type,
+            set=set,
+            features=features,
+            within=within,
+            case_sensitive=case_sensitive,
+        )
+
     def save_changes(self,
-                     file_path=None):
+                     file_path=None,
+                     pretty_print=True,
+                     compress=None):
         """
         Saves any changes to the XML file, or otherwise to *file_path* if
         specified.
 
+        The document is serialized incrementally, one child of the root
+        element at a time, into a temporary file beside *file_path* which
+        then atomically replaces it, so that an interrupted save never leaves
+        a truncated document behind. The annotation sets of a streaming
+        document which have not been loaded are copied byte for byte from the
+        original file rather than parsed.
+
         :param file_path: (optional). The file path to write to.
         :type file_path: string
+
+        :param pretty_print: (optional). Indent new elements. Existing
+            whitespace is kept either way.
+        :type pretty_print: bool
+
+        :param compress: (optional). Compress the document with "gzip" or
+            "xz", or not at all if *False*. *True* means "gzip". By default,
+            the compression is chosen by the suffix of *file_path*, ".gz" or
+            ".xz". Documents are recognized as compressed by their contents
+            when read, whatever their suffix.
+        :type compress: string or bool
         """
         if not file_path:
             file_path = self.filename
-
-        self.tree.write(
-            file_path,
-            pretty_print=True,
-            xml_declaration=True,
+        if compress is None:
+            compression = get_compression(file_path)
+        elif compress is True:
+            compression = "gzip"
+        else:
+            compression = compress or None
+        if compression is not None and compression not in _compressions:
+            raise ValueError(
+                "Unknown compression: {!r}. Expected one of {}.".format(
+                    compression,
+                    sorted(_compressions),
+                )
+            )
+        in_place = os.path.abspath(file_path) == os.path.abspath(self.filename)
+        if (
+            in_place
+            and os.path.exists(file_path)
+            and compression != _detect_compression(file_path)
+        ):
+            # the document would no longer be read back the way the byte
+            # ranges of its unloaded sets were found
+            self._load_annotation_sets()
+
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(file_path)),
+            prefix=".{}.".format(os.path.basename(file_path)),
+            suffix=".tmp",
         )
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                if compression == "gzip":
+                    output_file = gzip.GzipFile(
+                        filename=os.path.basename(file_path),
+                        mode="wb",
+                        fileobj=temp_file,
+                    )
+                elif compression == "xz":
+                    output_file = lzma.LZMAFile(temp_file, mode="wb")
+                else:
+                    output_file = temp_file
+                with output_file:
+                    byte_ranges = self._write_xml(output_file, pretty_print)
+            if os.path.exists(file_path):
+                shutil.copymode(file_path, temp_path)
+            else:
+                # mkstemp creates files readable only by their owner
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(temp_path, 0o666 & ~umask)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        if in_place:
+            self._annotation_set_ranges = byte_ranges
+
+    def _write_xml(self,
+                   output_file,
+                   pretty_print):
+        # Serialize the document into *output_file*, returning the byte
+        # ranges at which unloaded annotation sets were copied.
+        tree = self.tree
+        root = self.root
+        encoding = tree.docinfo.encoding or "UTF-8"
+        byte_ranges = {}
+        source_file = None
+        # as tree.write lays out the top level of the document
+        newline = "\n".encode(encoding) if pretty_print else b""
+
+        def write_sibling(sibling):
+            # xmlfile only writes text and elements within the root element,
+            # so the root's siblings are serialized separately
+            output_file.write(
+                etree.tostring(
+                    sibling,
+                    encoding=encoding,
+                    xml_declaration=False,
+                    with_tail=False,
+                )
+            )
+            output_file.write(newline)
+
+        try:
+            with etree.xmlfile(output_file, encoding=encoding) as xml_file:
+                xml_file.write_declaration()
+                if tree.docinfo.doctype:
+                    xml_file.write_doctype(tree.docinfo.doctype)
+                xml_file.flush()
+                for sibling in reversed(list(root.itersiblings(preceding=True))):
+                    write_sibling(sibling)
+                with xml_file.element(root.tag, root.attrib, root.nsmap):
+                    if root.text:
+                        xml_file.write(root.text)
+                    for child in root:
+                        byte_range = self._annotation_set_ranges.get(child)
+                        if byte_range is None:
+                            tail = child.tail
+                            xml_file.write(
+                                child,
+                                with_tail=False,
+                                pretty_print=pretty_print,
+                            )
+                            if pretty_print and tail and tail.startswith("\n"):
+                                # pretty printing already ended the line
+                                tail = tail[1:]
+                        else:
+                            start, end = byte_range
+                            if source_file is None:
+                                source_file = open_document(self.filename)
+                            source_file.seek(start)
+                            xml_file.flush()
+                            new_start = output_file.tell()
+                            _copy_bytes(source_file, output_file, end - start)
+                            byte_ranges[child] = (new_start, output_file.tell())
+                            tail = child.tail
+                        if tail:
+                            xml_file.write(tail)
+            output_file.write(newline)
+            for sibling in root.itersiblings():
+                write_sibling(sibling)
+        finally:
+            if source_file is not None:
+                source_file.close()
+        return byte_ranges
 
     @property
     def annotation_sets(self):
@@ -235,6 +984,13 @@ class AnnotationFile:
         :type: list(:class:`~gatenlphiltlab.AnnotationSet`)
         """
         if not self._annotation_sets:
+            if self._cached_annotation_sets is not None:
+                self._annotation_sets = [
+                    AnnotationSet.from_cache(x, self)
+                    for x in self._cached_annotation_sets
+                ]
+                self._cached_annotation_sets = None
+                return self._annotation_sets
             annotation_set_elements = self.root.findall("./AnnotationSet")
             self._annotation_sets = [
                 AnnotationSet(x, self)
@@ -302,7 +1058,45 @@ class AnnotationFile:
         for offset in [annotation.start_node, annotation.end_node]:
             if offset not in self.nodes:
                 self.insert_node(offset)
-        self.interval_tree.add(annotation)
+        if self._static_interval_index:
+            # the static index can't be modified, so rebuild it on next use
+            self._interval_tree = None
+        else:
+            self.interval_tree.add(annotation)
+        self._add_to_type_interval_trees([annotation])
+        if self._feature_index is not None:
+            self._feature_index.add_annotation(annotation)
+        if self._annotations:
+            self._annotations.append(annotation)
+
+    def add_annotations(self,
+                        annotations):
+        """
+        Like :meth:`~gatenlphiltlab.AnnotationFile.add_annotation`, but
+        inserts all missing nodes in a single pass and adds *annotations* to
+        the interval tree as one batch. Generally, this should not need to be
+        called explicitly -- instead, use
+        :meth:`gatenlphiltlab.AnnotationSet.create_annotations`.
+
+        :param annotations: The annotations to add.
+        :type annotations: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        self.insert_nodes(
+            itertools.chain.from_iterable(
+                (annotation.start_node, annotation.end_node)
+                for annotation in annotations
+            )
+        )
+        if self._static_interval_index:
+            self._interval_tree = None
+        else:
+            self.interval_tree.update(annotations)
+        self._add_to_type_interval_trees(annotations)
+        if self._feature_index is not None:
+            for annotation in annotations:
+                self._feature_index.add_annotation(annotation)
+        if self._annotations:
+            self._annotations.extend(annotations)
 
 class AnnotationSet:
     """
@@ -314,16 +1108,66 @@ class AnnotationSet:
     :parameter annotation_file: The annotation file to which this annotation set belongs.
     :type annotation_file: :class:`~gatenlphiltlab.AnnotationFile`
     """
+    __slots__ = (
+        "__element",
+        "_annotation_file",
+        "_name",
+        "_max_id",
+        "_annotations",
+        "_columns",
+        "_views",
+        "_annotation_index",
+        "__weakref__",
+    )
+
     def __init__(self,
                  annotation_set_element,
                  annotation_file):
-        self._element = annotation_set_element
+        self.__element = annotation_set_element
         self._annotation_file = annotation_file
-        self._name = self._element.get("Name")
+        self._name = annotation_set_element.get("Name")
         if not self._name:
             self._name = ""
         self._max_id = None
         self._annotations = []
+        self._columns = None
+        self._views = {}
+        self._annotation_index = None
+
+    @classmethod
+    def from_cache(cls,
+                   cached_annotation_set,
+                   annotation_file):
+        """
+        Create an annotation set from an entry of a
+        :class:`~gatenlphiltlab.cache.DocumentCache`, without parsing any XML.
+        Its element is found within the document on first access.
+
+        :param cached_annotation_set: The cached annotation set.
+        :type cached_annotation_set: :class:`~gatenlphiltlab.cache.CachedAnnotationSet`
+
+        :param annotation_file: The annotation file to which this annotation set belongs.
+        :type annotation_file: :class:`~gatenlphiltlab.AnnotationFile`
+
+        :rtype: :class:`~gatenlphiltlab.AnnotationSet`
+        """
+        annotation_set = cls.__new__(cls)
+        annotation_set.__element = None
+        annotation_set._annotation_file = annotation_file
+        annotation_set._name = cached_annotation_set.name
+        annotation_set._max_id = None
+        annotation_set._annotations = []
+        annotation_set._columns = AnnotationColumns.from_arrays(
+            cached_annotation_set.ids,
+            cached_annotation_set.starts,
+            cached_annotation_set.ends,
+            cached_annotation_set.type_codes,
+            cached_annotation_set.type_names,
+            lambda: annotation_set._element.iterfind("./Annotation"),
+        )
+        annotation_set._views = {}
+        annotation_set._annotation_index = None
+        return annotation_set
 
     def __str__(self):
         return ", ".join(
@@ -364,6 +1208,42 @@ class AnnotationSet:
         """
         return self._annotation_file
 
+    @property
+    def _element(self):
+        if self.__element is None:
+            self.__element = (
+                self.annotation_file._find_annotation_set_element(self)
+            )
+        # annotation sets of streamed files are parsed on first access
+        if self.__element in self.annotation_file._annotation_set_ranges:
+            self.__element = self.annotation_file._load_annotation_set(
+                self.__element
+            )
+        return self.__element
+
+    @property
+    def columns(self):
+        """
+        The columnar store holding the ids, offsets, and types of this
+        annotation set's annotations, or *None* if the annotation file was not
+        loaded with *columnar* enabled.
+
+        :type: :class:`~gatenlphiltlab.AnnotationColumns`
+        """
+        if self._columns is None and self.annotation_file._columnar:
+            self._columns = AnnotationColumns(
+                self._element.iterfind("./Annotation")
+            )
+        return self._columns
+
+    def _view(self,
+              row):
+        annotation = self._views.get(row)
+        if annotation is None:
+            annotation = Annotation(None, self, row)
+            self._views[row] = annotation
+        return annotation
+
     @property
     def max_id(self):
         """
@@ -373,6 +1253,10 @@ class AnnotationSet:
         :type: string
         """
         if not self._max_id:
+            if self.columns is not None:
+                ids = self.columns.ids[self.columns.alive]
+                self._max_id = str(ids.max()) if len(ids) else None
+                return self._max_id
             if self._annotations:
                 annotations = self.annotations
             else:
@@ -411,12 +1295,58 @@ class AnnotationSet:
 
         :type: iterator
         """
+        if self.columns is not None:
+            for row in self.columns.rows():
+                yield self._view(row)
+            return
         annotations = self._element.iterfind(
             "./Annotation"
         )
         for x in annotations:
             yield Annotation(x, self)
 
+    def prefetch_features(self):
+        """
+        Decode the features of all annotations within this annotation set,
+        including continuations, in a single pass over its XML, rather than
+        one annotation at a time as each is first accessed. Annotations whose
+        features were already decoded are left as they are.
+        """
+        annotations = {}
+        for head in self.annotations:
+            for annotation in itertools.chain([head], head._continuations or ()):
+                if annotation._features is None:
+                    annotations[annotation._element] = annotation
+        if not annotations:
+            return
+        # a single iteration in lxml rather than a loop over the children of
+        # each annotation
+        features = None
+        feature = None
+        for element in self._element.iter(
+            "Annotation",
+            "Feature",
+            "Name",
+            "Value",
+        ):
+            tag = element.tag
+            if tag == "Annotation":
+                annotation = annotations.get(element)
+                if annotation is None:
+                    features = None
+                else:
+                    features = annotation._features = {}
+            elif features is None:
+                continue
+            elif tag == "Feature":
+                feature = Feature(element, annotation)
+            elif tag == "Name":
+                if feature._name is None:
+                    feature._name = element
+                    features[_intern(element.text)] = feature
+            elif feature._value is None:
+                feature._value = element
+
     @property
     def annotation_types(self):
         """
@@ -455,18 +1385,10 @@ class AnnotationSet:
         :type overwrite: bool
         """
         if overwrite == False:
-            existing_annotation = next(
-                (
-                    annotation
-                    for annotation in self.annotations
-                    if (
-                            annotation.type == annotation_type
-                            and annotation.start_node == start
-                            and annotation.end_node == end
-                    )
-                )
-                ,
-                None
+            existing_annotation = self.get_annotation(
+                annotation_type,
+                start,
+                end,
             )
             if existing_annotation:
                 return existing_annotation
@@ -479,6 +1401,10 @@ class AnnotationSet:
             annotation_id = str(int(self.max_id) + 1)
         else:
             annotation_id = str(1)
+        columns = self.columns
+        # load the existing annotations first, or the new annotation would
+        # be the only one this set has loaded
+        self.annotations
 
         annotation_element = self._element.makeelement(
             "Annotation",
@@ -497,12 +1423,99 @@ class AnnotationSet:
         self.annotation_file.add_annotation(annotation)
 
         self._element.append(annotation_element)
+        if columns is not None:
+            annotation._row = columns.append(annotation_element)
+            self._views[annotation._row] = annotation
         self._annotations.append(annotation)
+        self._add_to_index(annotation)
 
         self._max_id = int(annotation_id)
 
         return annotation
 
+    def create_annotations(self,
+                           annotations,
+                           overwrite=False):
+        """
+        Create many annotations in this annotation set at once. This is
+        equivalent to calling
+        :meth:`~gatenlphiltlab.AnnotationSet.create_annotation` for each of
+        *annotations*, but missing nodes are inserted in a single pass, ids
+        are assigned in one go, and the new annotations are indexed as one
+        batch.
+
+        :param annotations: (annotation_type, start, end) or (annotation_type, start, end, feature_dict) tuples describing the annotations to create. Separate arrays can be passed as e.g. ``zip(types, starts, ends)``.
+        :type annotations: iterable(tuple)
+
+        :param overwrite: Overwrite any existing annotation of matching type, start, and end.
+        :type overwrite: bool
+
+        :returns: The annotation for each of *annotations*. Where *overwrite* is *False*, an existing matching annotation is returned in place of a new one.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        if self.max_id:
+            next_id = int(self.max_id) + 1
+        else:
+            next_id = 1
+        columns = self.columns
+        self._index
+
+        results = []
+        new_annotations = []
+        for annotation_spec in annotations:
+            annotation_type, start, end = annotation_spec[:3]
+            start, end = int(start), int(end)
+            if overwrite == False:
+                existing_annotation = self.get_annotation(
+                    annotation_type,
+                    start,
+                    end,
+                )
+                if existing_annotation:
+                    results.append(existing_annotation)
+                    continue
+
+            annotation_element = self._element.makeelement(
+                "Annotation",
+                attrib={
+                    "Type": annotation_type,
+                    "Id": str(next_id),
+                    "StartNode": str(start),
+                    "EndNode": str(end),
+                }
+            )
+            next_id += 1
+            annotation = Annotation(annotation_element, self)
+            if len(annotation_spec) > 3 and annotation_spec[3]:
+                for name, value in annotation_spec[3].items():
+                    annotation.add_feature(name, value)
+            self._add_to_index(annotation)
+            results.append(annotation)
+            new_annotations.append(annotation)
+
+        if not new_annotations:
+            return results
+
+        self.annotation_file.add_annotations(new_annotations)
+
+        new_elements = [
+            annotation._element
+            for annotation in new_annotations
+        ]
+        self._element.extend(new_elements)
+        if columns is not None:
+            for annotation, row in zip(
+                new_annotations,
+                columns.extend(new_elements),
+            ):
+                annotation._row = row
+                self._views[row] = annotation
+        self._annotations.extend(new_annotations)
+
+        self._max_id = next_id - 1
+
+        return results
+
     def append(self, annotation):
         """
         Add an annotation to the end of this annotation set.
@@ -510,9 +1523,58 @@ class AnnotationSet:
         :param annotation: The annotation to append.
         :type annotation: :class:`~gatenlphiltlab.Annotation`
         """
+        columns = self.columns
         self._element.append(annotation._element)
+        if columns is not None:
+            columns.append(annotation._element)
         if self._annotations:
             self._annotations.append(annotation)
+        self._add_to_index(annotation)
+
+    def get_annotation(self,
+                       annotation_type,
+                       start,
+                       end):
+        """
+        :returns: The first annotation in this annotation set of type *annotation_type* spanning *start* to *end*, or *None* if there is none.
+        :rtype: :class:`~gatenlphiltlab.Annotation`
+        """
+        matches = self._index.get((annotation_type, start, end))
+        if matches:
+            return matches[0]
+        return None
+
+    @property
+    def _index(self):
+        # (type, start, end) -> annotations, for constant time lookups of
+        # duplicate annotations
+        if self._annotation_index is None:
+            self._annotation_index = {}
+            for annotation in self.annotations:
+                self._annotation_index.setdefault(
+                    _get_index_key(annotation),
+                    [],
+                ).append(annotation)
+        return self._annotation_index
+
+    def _add_to_index(self,
+                      annotation):
+        if self._annotation_index is not None:
+            self._annotation_index.setdefault(
+                _get_index_key(annotation),
+                [],
+            ).append(annotation)
+
+    def _remove_from_index(self,
+                           annotation):
+        if self._annotation_index is None:
+            return
+        key = _get_index_key(annotation)
+        matches = self._annotation_index.get(key, [])
+        if annotation in matches:
+            matches.remove(annotation)
+            if not matches:
+                del self._annotation_index[key]
 
     def delete(self):
         """
@@ -524,6 +1586,206 @@ class AnnotationSet:
         del self.annotation_file.annotation_sets_dict[self.name]
 
 
+class AnnotationColumns:
+    """
+    A columnar store of the ids, offsets, and types of a group of
+    annotations, held in `numpy <http://www.numpy.org/>`_ arrays so that
+    scans, sorts, and filters can be vectorized. Annotation types are interned
+    as integer codes. Row *i* of each column belongs to the i-th element of
+    :attr:`elements`. Deleted rows are kept (see :attr:`alive`) so that row
+    numbers remain stable.
+
+    :parameter annotation_elements: The lxml elements of the annotations.
+    :type annotation_elements: iterable of `lxml.etree._Element <http://lxml.de/api/lxml.etree._Element-class.html>`_
+    """
+    def __init__(self,
+                 annotation_elements=()):
+        self._elements = []
+        self._load_elements = None
+        self.type_names = []
+        self._type_codes = {}
+        self._size = 0
+        self._ids = numpy.empty(0, dtype=numpy.int64)
+        self._starts = numpy.empty(0, dtype=numpy.int64)
+        self._ends = numpy.empty(0, dtype=numpy.int64)
+        self._codes = numpy.empty(0, dtype=numpy.int32)
+        self._alive = numpy.empty(0, dtype=bool)
+        self.extend(annotation_elements)
+
+    @classmethod
+    def from_arrays(cls,
+                    ids,
+                    starts,
+                    ends,
+                    type_codes,
+                    type_names,
+                    load_elements):
+        """
+        Create a store from existing columns, e.g. those of a
+        :class:`~gatenlphiltlab.cache.DocumentCache` entry. The elements are
+        only loaded once :attr:`elements` is first accessed.
+
+        :param type_names: The annotation type of each code in *type_codes*.
+        :type type_names: list(string)
+
+        :param load_elements: A function returning the lxml elements of the rows, in order.
+        :type load_elements: function
+
+        :rtype: :class:`~gatenlphiltlab.AnnotationColumns`
+        """
+        columns = cls()
+        columns._ids = numpy.array(ids, dtype=numpy.int64)
+        columns._starts = numpy.array(starts, dtype=numpy.int64)
+        columns._ends = numpy.array(ends, dtype=numpy.int64)
+        columns._codes = numpy.array(type_codes, dtype=numpy.int32)
+        columns._alive = numpy.ones(len(columns._ids), dtype=bool)
+        columns._size = len(columns._ids)
+        for type_name in type_names:
+            columns._intern_type(type_name)
+        columns._elements = None
+        columns._load_elements = load_elements
+        columns._loaded_size = columns._size
+        return columns
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def elements(self):
+        """
+        The lxml element of each row.
+
+        :type: list(`lxml.etree._Element <http://lxml.de/api/lxml.etree._Element-class.html>`_)
+        """
+        if self._elements is None:
+            # rows added since the store was created add their own elements
+            self._elements = list(
+                itertools.islice(self._load_elements(), self._loaded_size)
+            )
+            self._load_elements = None
+        return self._elements
+
+    @property
+    def ids(self):
+        """
+        :type: numpy.ndarray
+        """
+        return self._ids[:self._size]
+
+    @property
+    def starts(self):
+        """
+        :type: numpy.ndarray
+        """
+        return self._starts[:self._size]
+
+    @property
+    def ends(self):
+        """
+        :type: numpy.ndarray
+        """
+        return self._ends[:self._size]
+
+    @property
+    def type_codes(self):
+        """
+        The interned annotation type of each row. See :meth:`type_code`.
+
+        :type: numpy.ndarray
+        """
+        return self._codes[:self._size]
+
+    @property
+    def alive(self):
+        """
+        A boolean mask of the rows which have not been deleted.
+
+        :type: numpy.ndarray
+        """
+        return self._alive[:self._size]
+
+    def type_code(self,
+                  type_name):
+        """
+        :returns: The integer code interned for *type_name*, or -1 if no annotation in the store has that type.
+        :rtype: int
+        """
+        return self._type_codes.get(type_name, -1)
+
+    def _intern_type(self,
+                     type_name):
+        code = self._type_codes.get(type_name)
+        if code is None:
+            code = len(self.type_names)
+            self._type_codes[type_name] = code
+            self.type_names.append(type_name)
+        return code
+
+    def _reserve(self,
+                 size):
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+        for name in ("_ids", "_starts", "_ends", "_codes", "_alive"):
+            column = getattr(self, name)
+            resized = numpy.empty(capacity, dtype=column.dtype)
+            resized[:self._size] = column[:self._size]
+            setattr(self, name, resized)
+
+    def extend(self,
+               annotation_elements):
+        """
+        Add a row for each of *annotation_elements*.
+
+        :returns: The row numbers of the new rows.
+        :rtype: range
+        """
+        elements = list(annotation_elements)
+        first_row = self._size
+        last_row = first_row + len(elements)
+        self._reserve(last_row)
+        self._ids[first_row:last_row] = [
+            int(element.get("Id")) for element in elements
+        ]
+        self._starts[first_row:last_row] = [
+            int(element.get("StartNode")) for element in elements
+        ]
+        self._ends[first_row:last_row] = [
+            int(element.get("EndNode")) for element in elements
+        ]
+        self._codes[first_row:last_row] = [
+            self._intern_type(element.get("Type")) for element in elements
+        ]
+        self._alive[first_row:last_row] = True
+        self.elements.extend(elements)
+        self._size = last_row
+        return range(first_row, last_row)
+
+    def append(self,
+               annotation_element):
+        """
+        Add a row for *annotation_element*.
+
+        :returns: The row number of the new row.
+        :rtype: int
+        """
+        return self.extend([annotation_element])[0]
+
+    def delete(self,
+               row):
+        """
+        Mark *row* as deleted.
+        """
+        self._alive[row] = False
+
+    def rows(self):
+        """
+        :returns: The row numbers of all rows which have not been deleted.
+        :rtype: numpy.ndarray
+        """
+        return numpy.flatnonzero(self.alive)
+
 class GateIntervalTree:
     """
     An `interval tree <https://en.wikipedia.org/wiki/Interval_tree>`_ that
@@ -537,6 +1799,9 @@ class GateIntervalTree:
         for x in self._tree:
             yield x.data
 
+    def __len__(self):
+        return len(self._tree)
+
     def add(self,
             annotation):
         """
@@ -553,6 +1818,68 @@ class GateIntervalTree:
             annotation,
         )
 
+    def remove(self,
+               annotation):
+        """
+        Remove *annotation* from the tree, if present. Its offsets must not
+        have changed since it was added.
+
+        :param annotation: The annotation to remove.
+        :type annotation: :class:`~gatenlphiltlab.Annotation`
+        """
+        self._tree.discard(
+            intervaltree.Interval(
+                annotation.start_node,
+                annotation.end_node,
+                annotation,
+            )
+        )
+
+    def update(self,
+               annotations):
+        """
+        Add all of *annotations* to the tree.
+
+        :param annotations: The annotations to add.
+        :type annotations: iterable(:class:`~gatenlphiltlab.Annotation`)
+        """
+        intervals = [
+            intervaltree.Interval(
+                annotation.start_node,
+                annotation.end_node,
+                annotation,
+            )
+            for annotation in annotations
+            if annotation.start_node < annotation.end_node
+        ]
+        if len(intervals) >= len(self._tree):
+            # building a balanced tree from scratch beats inserting one by
+            # one when the batch outnumbers the existing intervals
+            self._tree = intervaltree.IntervalTree(
+                itertools.chain(self._tree, intervals)
+            )
+        else:
+            self._tree.update(intervals)
+
+    def _overlap(self,
+                 start,
+                 end):
+        # intervaltree 3 renamed search() to overlap()
+        if hasattr(self._tree, "overlap"):
+            return self._tree.overlap(start, end)
+        return self._tree.search(start, end)
+
+    def search_span(self,
+                    start,
+                    end):
+        """
+        :returns: All annotations in the tree whose text overlaps the span from *start* to *end*.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        if start >= end:
+            return []
+        return [ match.data for match in self._overlap(start, end) ]
+
     def search(self,
                annotation):
         """
@@ -564,7 +1891,7 @@ class GateIntervalTree:
                 [
                     [
                         match.data
-                        for match in self._tree.search(
+                        for match in self._overlap(
                             annotation_span.start_node,
                             annotation_span.end_node,
                         )
@@ -575,6 +1902,707 @@ class GateIntervalTree:
             )
         )
 
+class StaticIntervalIndex:
+    """
+    An immutable alternative to :class:`~gatenlphiltlab.GateIntervalTree`,
+    laid out as a `nested containment list
+    <https://doi.org/10.1093/bioinformatics/btl647>`_ in flat arrays. It is
+    much cheaper to build and much smaller in memory than an interval tree,
+    which suits documents that are indexed once and queried many times.
+
+    :parameter annotations: The annotations to index.
+    :type annotations: iterable(:class:`~gatenlphiltlab.Annotation`)
+    """
+    def __init__(self,
+                 annotations):
+        annotations = [
+            annotation
+            for annotation in annotations
+            if annotation.start_node < annotation.end_node
+        ]
+        starts = [ annotation.start_node for annotation in annotations ]
+        ends = [ annotation.end_node for annotation in annotations ]
+        order = sorted(
+            range(len(annotations)),
+            key=lambda i: (starts[i], -ends[i]),
+        )
+
+        # each interval's parent is the nearest preceding interval which
+        # contains it; intervals without one form the top level list
+        children = {-1: []}
+        stack = []
+        for i in order:
+            while stack and ends[stack[-1]] < ends[i]:
+                stack.pop()
+            children.setdefault(stack[-1] if stack else -1, []).append(i)
+            stack.append(i)
+
+        # lay out every list contiguously, the top level list first
+        layout = list(children[-1])
+        self._sublist_starts = array("q")
+        self._sublist_ends = array("q")
+        for i in layout:
+            sublist = children.get(i, ())
+            self._sublist_starts.append(len(layout))
+            layout.extend(sublist)
+            self._sublist_ends.append(len(layout))
+        self._top_level_length = len(children[-1])
+        self._starts = array("q", (starts[i] for i in layout))
+        self._ends = array("q", (ends[i] for i in layout))
+        self._annotations = [ annotations[i] for i in layout ]
+
+        self._sorted_starts = array("q", sorted(starts))
+        self._sorted_ends = array("q", sorted(ends))
+        # built on the first call to search_spans
+        self._search_keys = None
+
+    def __iter__(self):
+        return iter(self._annotations)
+
+    def __len__(self):
+        return len(self._annotations)
+
+    def search_span(self,
+                    start,
+                    end):
+        """
+        :returns: All annotations in the index whose text overlaps the span from *start* to *end*.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        matches = []
+        if start >= end:
+            return matches
+        lists = [(0, self._top_level_length)]
+        while lists:
+            low, high = lists.pop()
+            # within a list no interval contains another, so the ends are
+            # sorted as well as the starts
+            i = bisect_right(self._ends, start, low, high)
+            while i < high and self._starts[i] < end:
+                matches.append(self._annotations[i])
+                if self._sublist_starts[i] < self._sublist_ends[i]:
+                    lists.append(
+                        (self._sublist_starts[i], self._sublist_ends[i])
+                    )
+                i += 1
+        return matches
+
+    def search_spans(self,
+                     spans):
+        """
+        Search for many spans at once. Vectorized with numpy when it is
+        available, looking up the matches of all of *spans* in each level of
+        nested lists together.
+
+        :param spans: (start, end) pairs.
+        :type spans: iterable(tuple(int, int))
+
+        :returns: For each of *spans*, all annotations in the index whose text overlaps it.
+        :rtype: list(list(:class:`~gatenlphiltlab.Annotation`))
+        """
+        spans = list(spans)
+        if numpy is None or not self._annotations:
+            return [ self.search_span(start, end) for start, end in spans ]
+        start_keys, end_keys, child_lists, scale = self._get_search_keys()
+        spans = numpy.asarray(spans, dtype=numpy.int64).reshape(-1, 2)
+        queries = numpy.flatnonzero(spans[:, 0] < spans[:, 1])
+        # no annotation starts before 0 or ends after scale - 1, so clipping
+        # the spans keeps the keys of each search within its own list
+        starts = numpy.clip(spans[queries, 0], 0, scale - 1)
+        ends = numpy.clip(spans[queries, 1], 0, scale - 1)
+        lists = numpy.zeros(len(queries), dtype=numpy.int64)
+        found_queries = [ numpy.zeros(0, dtype=numpy.int64) ]
+        found_positions = [ numpy.zeros(0, dtype=numpy.int64) ]
+        while len(queries):
+            lows = numpy.searchsorted(
+                end_keys,
+                lists * scale + starts,
+                "right",
+            )
+            highs = numpy.searchsorted(
+                start_keys,
+                lists * scale + ends,
+                "left",
+            )
+            counts = highs - lows
+            # the positions from each low to its high, one after another
+            positions = numpy.arange(counts.sum()) + numpy.repeat(
+                lows - (numpy.cumsum(counts) - counts),
+                counts,
+            )
+            matched_queries = numpy.repeat(numpy.arange(len(queries)), counts)
+            found_queries.append(queries[matched_queries])
+            found_positions.append(positions)
+            # then search the lists nested within those matched
+            nested = child_lists[positions] >= 0
+            matched_queries = matched_queries[nested]
+            queries = queries[matched_queries]
+            starts = starts[matched_queries]
+            ends = ends[matched_queries]
+            lists = child_lists[positions[nested]]
+
+        found_queries = numpy.concatenate(found_queries)
+        found_positions = numpy.concatenate(found_positions)
+        order = numpy.lexsort((found_positions, found_queries))
+        bounds = numpy.searchsorted(
+            found_queries[order],
+            numpy.arange(len(spans) + 1),
+        ).tolist()
+        found_positions = found_positions[order].tolist()
+        annotations = self._annotations
+        return [
+            [ annotations[i] for i in found_positions[low:high] ]
+            for low, high in zip(bounds, bounds[1:])
+        ]
+
+    def _get_search_keys(self):
+        # The starts and ends of the intervals in the layout, each plus the
+        # number of the list it is in times *scale*. The lists are laid out
+        # in the order of their numbers, and the starts and ends within each
+        # list are sorted, so the keys are sorted throughout. Also the number
+        # of the list nested within each interval, or -1.
+        if self._search_keys is None:
+            length = len(self._annotations)
+            lists = numpy.zeros(length, dtype=numpy.int64)
+            child_lists = numpy.full(length, -1, dtype=numpy.int64)
+            list_number = 0
+            for i in range(length):
+                low = self._sublist_starts[i]
+                high = self._sublist_ends[i]
+                if low < high:
+                    list_number += 1
+                    child_lists[i] = list_number
+                    lists[low:high] = list_number
+            scale = max(self._ends) + 1
+            self._search_keys = (
+                lists * scale + numpy.array(self._starts, dtype=numpy.int64),
+                lists * scale + numpy.array(self._ends, dtype=numpy.int64),
+                child_lists,
+                scale,
+            )
+        return self._search_keys
+
+    def count_overlapping(self,
+                          spans):
+        """
+        Count the annotations overlapping each of *spans* without retrieving
+        them. Vectorized with numpy when it is available.
+
+        :param spans: (start, end) pairs.
+        :type spans: iterable(tuple(int, int))
+
+        :rtype: list(int)
+        """
+        spans = list(spans)
+        if numpy is not None:
+            spans = numpy.asarray(spans, dtype=numpy.int64).reshape(-1, 2)
+            counts = (
+                numpy.searchsorted(self._sorted_starts, spans[:, 1], "left")
+                - numpy.searchsorted(self._sorted_ends, spans[:, 0], "right")
+            )
+            counts[spans[:, 0] >= spans[:, 1]] = 0
+            return counts.tolist()
+        return [
+            bisect_left(self._sorted_starts, end)
+            - bisect_right(self._sorted_ends, start)
+            if start < end else 0
+            for start, end in spans
+        ]
+
+    def search(self,
+               annotation):
+        """
+        :returns: All annotations in the index whose text overlaps the given annotation.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        return list(
+            itertools.chain.from_iterable(
+                self.search_span(
+                    annotation_span.start_node,
+                    annotation_span.end_node,
+                )
+                for annotation_span
+                in annotation.spans
+            )
+        )
+
+class FeatureIndex:
+    """
+    An inverted index from feature names and values to the annotations which
+    have them, so that annotations can be found by feature without decoding
+    the features of every annotation. Rather than constructing one directly,
+    load an :class:`~gatenlphiltlab.AnnotationFile` with *feature_index*
+    enabled and use its :attr:`~gatenlphiltlab.AnnotationFile.feature_index`,
+    which is kept current as annotations are created and deleted, and as
+    features are added, removed, renamed, or given new values.
+    """
+    def __init__(self):
+        # feature name -> value -> annotations, as an ordered set
+        self._annotations = {}
+        # annotation -> feature name -> value
+        self._features = {}
+        # feature name -> sorted values, for prefix searches
+        self._sorted_values = {}
+
+    def __len__(self):
+        return len(self._features)
+
+    def __contains__(self,
+                     annotation):
+        return annotation in self._features
+
+    def add_annotation(self,
+                       annotation,
+                       features=None):
+        """
+        Add *annotation* to the index, replacing any previous entry for it.
+
+        :param annotation: The annotation to add.
+        :type annotation: :class:`~gatenlphiltlab.Annotation`
+
+        :param features: (optional). The annotation's feature values by name. By default, they are read from its :attr:`~gatenlphiltlab.Annotation.features`.
+        :type features: dict({ string : string })
+        """
+        if features is None:
+            features = {
+                name : feature.value
+                for name, feature in annotation.features.items()
+            }
+        self.remove_annotation(annotation)
+        self._features[annotation] = {}
+        for name, value in features.items():
+            self.add(annotation, name, value)
+
+    def remove_annotation(self,
+                          annotation):
+        """
+        Remove *annotation* from the index, if present.
+
+        :param annotation: The annotation to remove.
+        :type annotation: :class:`~gatenlphiltlab.Annotation`
+        """
+        features = self._features.pop(annotation, None)
+        if features is None:
+            return
+        for name, value in features.items():
+            self._remove_posting(annotation, name, value)
+
+    def add(self,
+            annotation,
+            name,
+            value):
+        """
+        Record that *annotation* has the feature *name* with *value*,
+        replacing any previous value. Annotations which are not in the index
+        are ignored.
+
+        :param annotation: The annotation.
+        :type annotation: :class:`~gatenlphiltlab.Annotation`
+
+        :param name: The feature name.
+        :type name: string
+
+        :param value: The feature value.
+        :type value: string
+        """
+        features = self._features.get(annotation)
+        if features is None:
+            return
+        if name in features:
+            self._remove_posting(annotation, name, features[name])
+        name = _intern(name)
+        features[name] = value
+        values = self._annotations.setdefault(name, {})
+        if value not in values:
+            values[value] = {}
+            self._sorted_values.pop(name, None)
+        values[value][annotation] = None
+
+    def discard(self,
+                annotation,
+                name):
+        """
+        Record that *annotation* no longer has the feature *name*.
+
+        :param annotation: The annotation.
+        :type annotation: :class:`~gatenlphiltlab.Annotation`
+
+        :param name: The feature name.
+        :type name: string
+        """
+        features = self._features.get(annotation)
+        if features is None or name not in features:
+            return
+        self._remove_posting(annotation, name, features.pop(name))
+
+    def _remove_posting(self,
+                        annotation,
+                        name,
+                        value):
+        values = self._annotations[name]
+        annotations = values[value]
+        del annotations[annotation]
+        if not annotations:
+            del values[value]
+            self._sorted_values.pop(name, None)
+            if not values:
+                del self._annotations[name]
+
+    def get_features(self,
+                     annotation):
+        """
+        :returns: The indexed feature values of *annotation* by name, which must not be modified, or *None* if the annotation is not in the index.
+        :rtype: dict({ string : string })
+        """
+        return self._features.get(annotation)
+
+    @property
+    def names(self):
+        """
+        The names of all indexed features.
+
+        :type: list(string)
+        """
+        return list(self._annotations)
+
+    def get_values(self,
+                   name):
+        """
+        :returns: Every value of the feature *name* within the index, in sorted order. Features without a value are left out.
+        :rtype: list(string)
+        """
+        sorted_values = self._sorted_values.get(name)
+        if sorted_values is None:
+            sorted_values = sorted(
+                value
+                for value in self._annotations.get(name, ())
+                if value is not None
+            )
+            self._sorted_values[name] = sorted_values
+        return sorted_values
+
+    def count(self,
+              name,
+              value):
+        """
+        :returns: The number of annotations with the feature *name* of *value*.
+        :rtype: int
+        """
+        return len(self._annotations.get(name, {}).get(value, ()))
+
+    def find(self,
+             name,
+             value):
+        """
+        :returns: All annotations with the feature *name* of *value*.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        return list(self._annotations.get(name, {}).get(value, ()))
+
+    def find_any(self,
+                 name,
+                 values):
+        """
+        :returns: All annotations with the feature *name* of any of *values*.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        postings = self._annotations.get(name, {})
+        return list(
+            itertools.chain.from_iterable(
+                postings.get(value, ())
+                for value in frozenset(values)
+            )
+        )
+
+    def find_prefix(self,
+                    name,
+                    prefix):
+        """
+        :returns: All annotations with the feature *name* of a value which starts with *prefix*.
+        :rtype: list(:class:`~gatenlphiltlab.Annotation`)
+        """
+        sorted_values = self.get_values(name)
+        postings = self._annotations.get(name, {})
+        annotations = []
+        for i in range(bisect_left(sorted_values, prefix), len(sorted_values)):
+            value = sorted_values[i]
+            if not value.startswith(prefix):
+                break
+            annotations.extend(postings[value])
+        return annotations
+
+class SpanSet(collections.abc.Set):
+    """
+    A set of character offsets, stored as sorted, disjoint (start, end)
+    spans rather than one integer per character, so that the cost of set
+    operations scales with the number of spans instead of the number of
+    characters. A span set implements :class:`collections.abc.Set`, and can
+    stand in for a frozenset of the same offsets: it iterates over each
+    offset, compares equal to such a frozenset and hashes the same, and
+    combines with other sets through the same methods and operators, on
+    either side.
+
+    :parameter spans: (start, end) pairs, which may overlap or be unsorted.
+    :type spans: iterable(tuple(int, int))
+    """
+    def __init__(self,
+                 spans=()):
+        merged_spans = []
+        for start, end in sorted(spans):
+            if start >= end:
+                continue
+            if merged_spans and start <= merged_spans[-1][1]:
+                if end > merged_spans[-1][1]:
+                    merged_spans[-1] = (merged_spans[-1][0], end)
+            else:
+                merged_spans.append((start, end))
+        self._spans = tuple(merged_spans)
+        self._starts = [ start for start, _ in self._spans ]
+        self._hash = None
+
+    @classmethod
+    def from_offsets(cls,
+                     offsets):
+        """
+        :param offsets: Character offsets.
+        :type offsets: iterable(int)
+
+        :rtype: :class:`~gatenlphiltlab.SpanSet`
+        """
+        return cls((offset, offset + 1) for offset in offsets)
+
+    @classmethod
+    def _from_iterable(cls,
+                       offsets):
+        # how the collections.abc.Set mixin methods build their results
+        return cls.from_offsets(offsets)
+
+    def __repr__(self):
+        return "SpanSet({})".format(list(self._spans))
+
+    def __len__(self):
+        return sum(end - start for start, end in self._spans)
+
+    def __bool__(self):
+        return bool(self._spans)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(
+            range(start, end) for start, end in self._spans
+        )
+
+    def __contains__(self,
+                     offset):
+        # as for a frozenset of ints, which contains 1.0 but not 1.5 or "1"
+        if not isinstance(offset, numbers.Real) or offset % 1:
+            return False
+        i = bisect_right(self._starts, offset) - 1
+        return i >= 0 and offset < self._spans[i][1]
+
+    def __eq__(self,
+               other):
+        if isinstance(other, SpanSet):
+            return self._spans == other._spans
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return (
+            len(self) == len(other)
+            and all(offset in self for offset in other)
+        )
+
+    def __hash__(self):
+        # consistent with equality to a frozenset, at the cost of hashing
+        # each offset once
+        if self._hash is None:
+            self._hash = hash(frozenset(self))
+        return self._hash
+
+    @property
+    def spans(self):
+        """
+        The sorted, disjoint (start, end) spans making up this set.
+
+        :type: tuple(tuple(int, int))
+        """
+        return self._spans
+
+    def union(self,
+              *others):
+        """
+        :returns: The offsets in this set or any of *others*.
+        :rtype: :class:`~gatenlphiltlab.SpanSet`
+        """
+        return SpanSet(
+            itertools.chain(
+                self._spans,
+                *(_as_span_set(other)._spans for other in others)
+            )
+        )
+
+    def intersection(self,
+                     *others):
+        """
+        :returns: The offsets in this set and all of *others*.
+        :rtype: :class:`~gatenlphiltlab.SpanSet`
+        """
+        spans = self._spans
+        for other in others:
+            other_spans = _as_span_set(other)._spans
+            intersected_spans = []
+            i = j = 0
+            while i < len(spans) and j < len(other_spans):
+                start = max(spans[i][0], other_spans[j][0])
+                end = min(spans[i][1], other_spans[j][1])
+                if start < end:
+                    intersected_spans.append((start, end))
+                if spans[i][1] < other_spans[j][1]:
+                    i += 1
+                else:
+                    j += 1
+            spans = intersected_spans
+        return SpanSet(spans)
+
+    def difference(self,
+                   *others):
+        """
+        :returns: The offsets in this set but in none of *others*.
+        :rtype: :class:`~gatenlphiltlab.SpanSet`
+        """
+        spans = self._spans
+        for other in others:
+            other_spans = _as_span_set(other)._spans
+            remaining_spans = []
+            j = 0
+            for start, end in spans:
+                while j < len(other_spans) and other_spans[j][1] <= start:
+                    j += 1
+                k = j
+                while k < len(other_spans) and other_spans[k][0] < end:
+                    if start < other_spans[k][0]:
+                        remaining_spans.append((start, other_spans[k][0]))
+                    start = max(start, other_spans[k][1])
+                    k += 1
+                if start < end:
+                    remaining_spans.append((start, end))
+            spans = remaining_spans
+        return SpanSet(spans)
+
+    def symmetric_difference(self,
+                             other):
+        """
+        :returns: The offsets in either this set or *other*, but not both.
+        :rtype: :class:`~gatenlphiltlab.SpanSet`
+        """
+        other = _as_span_set(other)
+        return self.difference(other).union(other.difference(self))
+
+    def isdisjoint(self,
+                   other):
+        """
+        :returns: *True* if this set has no offsets in common with *other*.
+        :rtype: bool
+        """
+        other_spans = _as_span_set(other)._spans
+        i = j = 0
+        while i < len(self._spans) and j < len(other_spans):
+            if (
+                max(self._spans[i][0], other_spans[j][0])
+                < min(self._spans[i][1], other_spans[j][1])
+            ):
+                return False
+            if self._spans[i][1] < other_spans[j][1]:
+                i += 1
+            else:
+                j += 1
+        return True
+
+    def issubset(self,
+                 other):
+        """
+        :returns: *True* if every offset in this set is in *other*.
+        :rtype: bool
+        """
+        other = _as_span_set(other)
+        for start, end in self._spans:
+            i = bisect_right(other._starts, start) - 1
+            if i < 0 or other._spans[i][1] < end:
+                return False
+        return True
+
+    def issuperset(self,
+                   other):
+        """
+        :returns: *True* if every offset in *other* is in this set.
+        :rtype: bool
+        """
+        return _as_span_set(other).issubset(self)
+
+    # like those of a frozenset, the operators only take other sets, while
+    # the methods take any iterable of offsets
+
+    def __or__(self,
+               other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.union(other)
+
+    def __and__(self,
+                other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.intersection(other)
+
+    def __sub__(self,
+                other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.difference(other)
+
+    def __rsub__(self,
+                 other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return _as_span_set(other).difference(self)
+
+    def __xor__(self,
+                other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.symmetric_difference(other)
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __le__(self,
+               other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.issubset(other)
+
+    def __ge__(self,
+               other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return self.issuperset(other)
+
+    def __lt__(self,
+               other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return len(self) < len(other) and self.issubset(other)
+
+    def __gt__(self,
+               other):
+        if not isinstance(other, collections.abc.Set):
+            return NotImplemented
+        return len(self) > len(other) and self.issuperset(other)
+
+def _as_span_set(offsets):
+    if isinstance(offsets, SpanSet):
+        return offsets
+    return SpanSet.from_offsets(offsets)
+
 class Annotation:
     """
     An abstraction of a GATE annotation.
@@ -584,29 +2612,47 @@ class Annotation:
 
     :parameter annotation_set: The annotation set to which this annotation belongs.
     :type annotation_set: :class:`~gatenlphiltlab.AnnotationSet`
+
+    :parameter row: (optional). The row of this annotation within the annotation set's :attr:`~gatenlphiltlab.AnnotationSet.columns`. If given, the annotation's id, type, and offsets are read from the columns.
+    :type row: int
     """
+    # a document may hold hundreds of thousands of annotations, so they have
+    # no instance dictionary, and their containers are created on demand
+    __slots__ = (
+        "__element",
+        "_annotation_set",
+        "_row",
+        "_type",
+        "_id",
+        "_start_node",
+        "_end_node",
+        "_continuations",
+        "_features",
+        "_turn",
+        "__caused_event_id",
+        "previous",
+        "next",
+        "__weakref__",
+    )
+
     def __init__(self,
                  annotation_element,
-                 annotation_set):
-        self._element = annotation_element
+                 annotation_set,
+                 row=None):
+        self.__element = annotation_element
         self._annotation_set = annotation_set
+        self._row = row
         self._type = None
         self._id = None
         self._start_node = None
         self._end_node = None
-        self._continuations = []
-        self._features = {}
+        self._continuations = None
+        self._features = None
         self._turn = None
+        self.__caused_event_id = _UNDECODED
         self.previous = None
         self.next = None
 
-        if self.type.lower() == "attribution":
-            self._caused_event_id = None
-            for name, feature in self.features.items():
-                if name.lower() == "caused_event":
-                    self._caused_event_id = feature.value.split()[0]
-                    break
-
     def __str__(self):
         id_string = "id: {}".format(self.id)
         type_string = "type: {}".format(self.type)
@@ -646,10 +2692,21 @@ class Annotation:
         its parent objects (i.e. its AnnotationSet and AnnotationFile)
         """
         unlink(self)
+        self.annotation_file._remove_from_indexes(self)
+        if self._row is not None:
+            self.annotation_set.columns.delete(self._row)
+        self.annotation_set._remove_from_index(self)
         self.annotation_set._element.remove(self._element)
         self.annotation_set.annotations.remove(self)
         self.annotation_set.annotation_file.annotations.remove(self)
 
+    @property
+    def _element(self):
+        # views of cached columns locate their element on first access
+        if self.__element is None:
+            self.__element = self.annotation_set.columns.elements[self._row]
+        return self.__element
+
     @property
     def annotation_set(self):
         """
@@ -676,8 +2733,11 @@ class Annotation:
 
         :type: string
         """
+        if self._row is not None:
+            columns = self.annotation_set.columns
+            return columns.type_names[columns.type_codes[self._row]]
         if not self._type:
-            self._type = self._element.get("Type")
+            self._type = _intern(self._element.get("Type"))
         return self._type
 
     @property
@@ -687,6 +2747,8 @@ class Annotation:
 
         :type: string
         """
+        if self._row is not None:
+            return str(self.annotation_set.columns.ids[self._row])
         if not self._id:
             self._id = self._element.get("Id")
         return self._id
@@ -700,6 +2762,8 @@ class Annotation:
 
         :type: int
         """
+        if self._row is not None:
+            return int(self.annotation_set.columns.starts[self._row])
         if not self._start_node:
             self._start_node = int(self._element.get("StartNode"))
         return self._start_node
@@ -712,19 +2776,35 @@ class Annotation:
 
         :type: int
         """
+        if self._row is not None:
+            return int(self.annotation_set.columns.ends[self._row])
         if not self._end_node:
             self._end_node = int(self._element.get("EndNode"))
         return self._end_node
 
     @start_node.setter
     def start_node(self, start_node):
+        trees = self.annotation_file._detach_from_interval_trees(self)
+        self.annotation_set._remove_from_index(self)
         self._element.set("StartNode", str(start_node))
         self._start_node = start_node
+        if self._row is not None:
+            self.annotation_set.columns.starts[self._row] = start_node
+        self.annotation_set._add_to_index(self)
+        for tree in trees:
+            tree.add(self)
 
     @end_node.setter
     def end_node(self, end_node):
+        trees = self.annotation_file._detach_from_interval_trees(self)
+        self.annotation_set._remove_from_index(self)
         self._element.set("EndNode", str(end_node))
         self._end_node = end_node
+        if self._row is not None:
+            self.annotation_set.columns.ends[self._row] = end_node
+        self.annotation_set._add_to_index(self)
+        for tree in trees:
+            tree.add(self)
 
     @property
     def turn(self):
@@ -748,19 +2828,22 @@ class Annotation:
 
         :type: dict({ string : :class:`~gatenlphiltlab.Feature` })
         """
-        if not self._features:
-            features = [
-                Feature(x)
-                for x in self._element
-                if x.tag == "Feature"
-            ]
-            self._features = {
-                feature.name : feature
-                for feature in features
-            }
-            return self._features
-        else:
-            return self._features
+        if self._features is None:
+            self._features = _decode_features(self)
+        return self._features
+
+    @property
+    def _caused_event_id(self):
+        # the id of the event to which an attribution annotation attributes
+        # its cause, or None for any other annotation
+        if self.__caused_event_id is _UNDECODED:
+            self.__caused_event_id = None
+            if self.type.lower() == "attribution":
+                for name, feature in self.features.items():
+                    if name.lower() == "caused_event":
+                        self.__caused_event_id = feature.value.split()[0]
+                        break
+        return self.__caused_event_id
 
     @property
     def continuations(self):
@@ -771,6 +2854,8 @@ class Annotation:
 
         :type: list(:class:`~gatenlphiltlab.Annotation`)
         """
+        if self._continuations is None:
+            self._continuations = []
         return self._continuations
 
     @property
@@ -782,7 +2867,7 @@ class Annotation:
         :type: list(:class:`~gatenlphiltlab.Annotation`)
         """
         return list(
-            itertools.chain( [self], ( x for x in self.continuations ) )
+            itertools.chain( [self], ( x for x in self._continuations or () ) )
         )
 
     @property
@@ -792,18 +2877,7 @@ class Annotation:
 
         :type: string
         """
-        nodes = sorted(
-            self.char_set.intersection(
-                self.annotation_file.nodes.keys()
-            )
-        )
-        tails = [
-            self.annotation_file.nodes[node].tail
-            for node in nodes
-        ]
-        return "".join(
-            tail for tail in tails if tail
-        )
+        return self.annotation_file.text[self.start_node:self.end_node]
 
     def get_concatenated_text(self,
                               separator=" "):
@@ -820,36 +2894,30 @@ class Annotation:
     @property
     def char_set(self):
         """
-        A frozen set of all character offsets associated with this annotation.
+        The set of all character offsets associated with this annotation.
 
-        :type: frozenset
+        :type: :class:`~gatenlphiltlab.SpanSet`
         """
-        return frozenset(
-            range(
-                self.start_node,
-                self.end_node
-            )
-        )
+        return SpanSet([(self.start_node, self.end_node)])
 
     @property
     def concatenated_char_set(self):
         """
-        A frozen set of all character offsets associated with this annotation
+        The set of all character offsets associated with this annotation
         and any continuations.
 
-        :type: frozenset
+        :type: :class:`~gatenlphiltlab.SpanSet`
         """
-        if self.continuations:
-            return reduce(
-                lambda x,y : frozenset( x | y.char_set ),
-                self.spans[1:],
-                self.spans[0].char_set
+        if self._continuations:
+            return SpanSet(
+                (span.start_node, span.end_node)
+                for span in self.spans
             )
         else: return self.char_set
 
     def _add_continuation(self,
                           annotation):
-        self._continuations.append(annotation)
+        self.continuations.append(annotation)
 
     def remove_feature(self,
                        name):
@@ -863,6 +2931,9 @@ class Annotation:
             feature_element = self.features[name]._feature_element
             self._element.remove(feature_element)
             del self.features[name]
+            feature_index = self.annotation_file._feature_index
+            if feature_index is not None:
+                feature_index.discard(self, name)
         else:
             return
 
@@ -912,11 +2983,14 @@ class Annotation:
 
         self._element.append(feature_element)
 
-        feature = Feature(feature_element)
+        feature = Feature(feature_element, self)
 
         self._features.update(
-            { feature.name : feature }
+            { _intern(feature.name) : feature }
         )
+        feature_index = self.annotation_file._feature_index
+        if feature_index is not None:
+            feature_index.add(self, name, value)
 
     def get_intersecting_of_type(self,
                                  annotation_type,
@@ -929,7 +3003,7 @@ class Annotation:
         :param annotation_type: The type of annotation to restrict the search to.
         :type annotation_type: string
 
-        :param annotation_tree: The annotation tree to use for the search. Default is the tree associated with this annotation's AnnotationFile.
+        :param annotation_tree: The annotation tree to use for the search. Default is the tree of *annotation_type* annotations from :meth:`~gatenlphiltlab.AnnotationFile.get_type_interval_tree`.
         :type annotation_tree: (optional) :class:`~gatenlphiltlab.GateIntervalTree`
 
         :param case_sensitive: Factor case into determining overlapping annotation's types.
@@ -943,8 +3017,11 @@ class Annotation:
             else:
                 return a.lower() == b.lower()
 
-        if not annotation_tree:
-            annotation_tree = self.annotation_file.interval_tree
+        if annotation_tree is None:
+            return self.annotation_file.get_type_interval_tree(
+                annotation_type,
+                case_sensitive=case_sensitive,
+            ).search(self)
 
         return [
             intersecting_annotation
@@ -962,9 +3039,23 @@ class Feature:
 
     :parameter feature_element: The lxml element associated with this feature. 
     :type feature_element: `lxml.etree._Element <http://lxml.de/api/lxml.etree._Element-class.html>`_
+
+    :parameter annotation: (optional). The annotation to which this feature belongs, whose annotation file's :attr:`~gatenlphiltlab.AnnotationFile.feature_index` is then kept current when the name or value is set.
+    :type annotation: :class:`~gatenlphiltlab.Annotation`
     """
-    def __init__(self, feature_element):
+    __slots__ = (
+        "_feature_element",
+        "_annotation",
+        "_name",
+        "_value",
+        "__weakref__",
+    )
+
+    def __init__(self,
+                 feature_element,
+                 annotation=None):
         self._feature_element = feature_element
+        self._annotation = annotation
         self._name = None
         self._value = None
 
@@ -990,7 +3081,19 @@ class Feature:
 
     @name.setter
     def name(self, name):
+        if self._name is None:
+            self._name = self._feature_element.find("./Name")
+        old_name = self._name.text
         self._name.text = name
+        if self._annotation is not None:
+            features = self._annotation._features
+            if features is not None and features.get(old_name) is self:
+                del features[old_name]
+                features[_intern(name)] = self
+            feature_index = self._annotation.annotation_file._feature_index
+            if feature_index is not None:
+                feature_index.discard(self._annotation, old_name)
+                feature_index.add(self._annotation, name, self.value)
 
     @property
     def value(self):
@@ -1007,7 +3110,13 @@ class Feature:
 
     @value.setter
     def value(self, value):
+        if self._value is None:
+            self._value = self._feature_element.find("./Value")
         self._value.text = value
+        if self._annotation is not None:
+            feature_index = self._annotation.annotation_file._feature_index
+            if feature_index is not None:
+                feature_index.add(self._annotation, self.name, value)
 
     def tally(self):
         """
@@ -1058,13 +3167,22 @@ def dlink(annotations,
     :type sort: bool
     """
     if sort == True:
-        annotations = sorted(
-            sorted(
-                annotations,
-                key=lambda x: x.start_node,
-            ),
-            key=lambda x: x.end_node,
-        )
+        annotations = list(annotations)
+        columns = _get_shared_columns(annotations)
+        if columns is not None:
+            rows = _get_rows(annotations)
+            order = numpy.lexsort(
+                (columns.starts[rows], columns.ends[rows])
+            )
+            annotations = [ annotations[i] for i in order ]
+        else:
+            annotations = sorted(
+                sorted(
+                    annotations,
+                    key=lambda x: x.start_node,
+                ),
+                key=lambda x: x.end_node,
+            )
     for i, annotation in enumerate(annotations[:-1]):
         annotation.previous = annotations[ i-1 ]
         annotation.next = annotations[ i+1 ]
@@ -1089,6 +3207,158 @@ def unlink(annotation):
     elif annotation.next:
         annotation.next.previous = None
 
+_annotation_set_start_tag = re.compile(rb"<AnnotationSet\b[^>]*?(/?)>")
+_annotation_set_end_tag = b"</AnnotationSet>"
+
+def iter_annotation_set_ranges(xml_file,
+                               chunk_size=1 << 20):
+    """
+    Scan the raw bytes of a GATE XML document without parsing it, yielding
+    the byte range of each AnnotationSet element in document order.
+
+    :param xml_file: The GATE XML document, opened in binary mode.
+    :type xml_file: file object
+
+    :param chunk_size: The number of bytes to read at a time.
+    :type chunk_size: int
+
+    :rtype: iterator of tuple(int, int)
+    """
+    buffer = b""
+    buffer_offset = 0
+    set_start = None
+    while True:
+        chunk = xml_file.read(chunk_size)
+        buffer += chunk
+        position = 0
+        while True:
+            if set_start is None:
+                match = _annotation_set_start_tag.search(buffer, position)
+                if not match:
+                    break
+                position = match.end()
+                if match.group(1):
+                    yield (
+                        buffer_offset + match.start(),
+                        buffer_offset + position,
+                    )
+                else:
+                    set_start = buffer_offset + match.start()
+            else:
+                end = buffer.find(_annotation_set_end_tag, position)
+                if end == -1:
+                    break
+                position = end + len(_annotation_set_end_tag)
+                yield (set_start, buffer_offset + position)
+                set_start = None
+        if not chunk:
+            return
+        # hold on to any tag which may be cut off at the end of this chunk
+        partial_tag = buffer.rfind(b"<", position)
+        if partial_tag == -1:
+            partial_tag = len(buffer)
+        buffer = buffer[partial_tag:]
+        buffer_offset += partial_tag
+
+_compressions = {
+    "gzip": gzip,
+    "xz": lzma,
+}
+_compression_suffixes = {
+    ".gz": "gzip",
+    ".xz": "xz",
+}
+_compression_magic_numbers = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "xz",
+}
+
+def get_compression(filename):
+    """
+    :returns: The compression of the document at *filename* as given by its suffix, "gzip" for ".gz" and "xz" for ".xz", or *None* if it is not compressed.
+    :rtype: string
+    """
+    suffix = os.path.splitext(filename)[1].lower()
+    return _compression_suffixes.get(suffix)
+
+def _detect_compression(filename):
+    # by the magic number which the file starts with, as the suffix may not
+    # match the contents
+    with open(filename, "rb") as document_file:
+        head = document_file.read(6)
+    for magic_number, compression in _compression_magic_numbers.items():
+        if head.startswith(magic_number):
+            return compression
+    return None
+
+def open_document(filename):
+    """
+    Open a GATE XML document for reading in binary mode, decompressing it on
+    the fly if it is gzip- or xz-compressed, as found from its contents
+    rather than its suffix.
+
+    :param filename: The path to the document.
+    :type filename: string
+
+    :rtype: file object
+    """
+    compression = _detect_compression(filename)
+    if compression is None:
+        return open(filename, "rb")
+    return _compressions[compression].open(filename, "rb")
+
+def parse_document(filename):
+    """
+    Parse a GATE XML document, straight from its decompressor if it is
+    compressed.
+
+    :param filename: The path to the document.
+    :type filename: string
+
+    :rtype: `lxml.etree._ElementTree <http://lxml.de/api/lxml.etree._ElementTree-class.html>`_
+    """
+    if _detect_compression(filename) is None:
+        # let libxml2 read the file itself, which is faster
+        return etree.parse(filename)
+    with open_document(filename) as xml_file:
+        return etree.parse(xml_file)
+
+_UNDECODED = object()
+
+def _decode_features(annotation):
+    # Build the features of an annotation with one pass over its children,
+    # handing each Feature its Name and Value elements up front.
+    features = {}
+    for feature_element in annotation._element:
+        if feature_element.tag != "Feature":
+            continue
+        feature = Feature(feature_element, annotation)
+        for child in feature_element:
+            if child.tag == "Name" and feature._name is None:
+                feature._name = child
+            elif child.tag == "Value" and feature._value is None:
+                feature._value = child
+        features[_intern(feature.name)] = feature
+    return features
+
+def _intern(string):
+    # types and feature names repeat across many annotations, so keep a
+    # single copy of each
+    if string is None:
+        return None
+    return sys.intern(string)
+
+def _copy_bytes(source_file,
+                output_file,
+                size,
+                chunk_size=1 << 20):
+    while size > 0:
+        chunk = source_file.read(min(chunk_size, size))
+        if not chunk:
+            raise ValueError("{} ended unexpectedly.".format(source_file.name))
+        output_file.write(chunk)
+        size -= len(chunk)
+
 def find_from_index(index,
                     source_list,
                     match_function,
@@ -1145,34 +3415,180 @@ def concatenate_annotations(annotation_iterable):
 
     :rtype: list(:class:`~gatenlphiltlab.Annotation`)
     """
-    annotations = sorted(
-        sorted(
+    annotation_iterable = list(annotation_iterable)
+    columns = _get_shared_columns(annotation_iterable)
+    if columns is not None:
+        return _concatenate_columnar_annotations(annotation_iterable, columns)
+    return list(iter_concatenated_annotations(annotation_iterable))
+
+def iter_concatenated_annotations(annotation_iterable,
+                                  presorted=False):
+    """
+    A single pass, generator version of
+    :func:`~gatenlphiltlab.concatenate_annotations`. Each continuation
+    annotation is attached to the most recently seen annotation of its base
+    type, e.g. an "Event_continuation" to the last "Event". Continuations
+    with no such annotation before them are left out.
+
+    :param annotation_iterable: The iterable of annotations.
+    :type annotation_iterable: iterable of :class:`~gatenlphiltlab.Annotation`
+
+    :param presorted: *annotation_iterable* is already ordered by end offset (and annotation set name), so it can be consumed lazily rather than sorted up front. Head annotations are then yielded as soon as they are read, and their continuations are attached as the iterator reaches them.
+    :type presorted: bool
+
+    :rtype: iterator of :class:`~gatenlphiltlab.Annotation`
+    """
+    if not presorted:
+        annotation_iterable = sorted(
             annotation_iterable,
-            key=(lambda x: x.annotation_set.name)
-        ),
-        key=(lambda x: x.end_node)
-    )
+            key=(lambda x: (x.end_node, x.annotation_set.name))
+        )
 
-    for i, annotation in enumerate(annotations):
-        if "_continuation" in annotation.type:
-            continuation = annotation
-            base_annotation_type = (
-                continuation.type.replace("_continuation","")
+    last_seen = {}
+    for annotation in annotation_iterable:
+        annotation_type = annotation.type
+        if "_continuation" in annotation_type:
+            continued_annotation = last_seen.get(
+                annotation_type.replace("_continuation","")
             )
-            continued_annotation = next(
-                find_from_index(
-                    i,
-                    annotations,
-                    lambda x : x.type == base_annotation_type,
-                    reverse=True,
+            if continued_annotation is not None:
+                continued_annotation._add_continuation(annotation)
+        else:
+            last_seen[annotation_type] = annotation
+        if not annotation_type.endswith("_continuation"):
+            yield annotation
+
+def _get_type_key(annotation_type,
+                  case_sensitive=True):
+    if case_sensitive:
+        return (annotation_type, True)
+    return (annotation_type.lower(), False)
+
+def _get_index_key(annotation):
+    return (annotation.type, annotation.start_node, annotation.end_node)
+
+def _get_shared_columns(annotations):
+    # the columns backing all of *annotations*, if they share one store
+    if not annotations:
+        return None
+    annotation_set = annotations[0].annotation_set
+    if annotation_set.columns is None:
+        return None
+    if all(
+        annotation._row is not None
+        and annotation.annotation_set is annotation_set
+        for annotation in annotations
+    ):
+        return annotation_set.columns
+    return None
+
+def _get_rows(annotations):
+    return numpy.fromiter(
+        (annotation._row for annotation in annotations),
+        dtype=numpy.intp,
+        count=len(annotations),
+    )
+
+def _concatenate_columnar_annotations(annotations,
+                                      columns):
+    rows = _get_rows(annotations)
+    order = numpy.argsort(columns.ends[rows], kind="stable")
+    annotations = [ annotations[i] for i in order ]
+    type_codes = columns.type_codes[rows[order]]
+
+    is_continuation = numpy.zeros(len(annotations), dtype=bool)
+    for code, type_name in enumerate(columns.type_names):
+        if "_continuation" not in type_name:
+            continue
+        continuation_indices = numpy.flatnonzero(type_codes == code)
+        if type_name.endswith("_continuation"):
+            is_continuation[continuation_indices] = True
+        base_code = columns.type_code(type_name.replace("_continuation", ""))
+        base_indices = numpy.flatnonzero(type_codes == base_code)
+        # the nearest preceding annotation of the base type is the head
+        head_positions = numpy.searchsorted(
+            base_indices,
+            continuation_indices,
+        ) - 1
+        for i, head_position in zip(continuation_indices, head_positions):
+            if head_position >= 0:
+                annotations[base_indices[head_position]]._add_continuation(
+                    annotations[i]
                 )
-            )
-            continued_annotation._add_continuation(annotation)
 
     return [
         annotation
-        for annotation in annotations
-        if not annotation.type.endswith("_continuation")
+        for annotation, continuation in zip(annotations, is_continuation)
+        if not continuation
+    ]
+
+def get_intersecting_pairs(annotations_a,
+                           annotations_b,
+                           relation=None):
+    """
+    Find every pair of an annotation from *annotations_a* and an annotation
+    from *annotations_b* whose text spans (including continuations) overlap,
+    with a single sweep over both groups sorted by offset.
+
+    :param annotations_a: The first annotation of each pair is drawn from these.
+    :type annotations_a: iterable(:class:`~gatenlphiltlab.Annotation`)
+
+    :param annotations_b: The second annotation of each pair is drawn from these.
+    :type annotations_b: iterable(:class:`~gatenlphiltlab.Annotation`)
+
+    :param relation: (optional). Restrict the pairs to those where the first annotation "contains" the second, is "within" the second, or is "coextensive" with it.
+    :type relation: string
+
+    :rtype: list(tuple(:class:`~gatenlphiltlab.Annotation`, :class:`~gatenlphiltlab.Annotation`))
+    """
+    relations = {
+        None: lambda a, b: True,
+        "contains": lambda a, b: a.issuperset(b),
+        "within": lambda a, b: a.issubset(b),
+        "coextensive": lambda a, b: a == b,
+    }
+    if relation not in relations:
+        raise ValueError("Unknown relation: {}".format(relation))
+    is_related = relations[relation]
+
+    def get_spans(annotations, side):
+        return [
+            (span.start_node, span.end_node, side, i)
+            for i, annotation in enumerate(annotations)
+            for span in annotation.spans
+            if span.start_node < span.end_node
+        ]
+
+    annotations_a = list(annotations_a)
+    annotations_b = list(annotations_b)
+    spans = sorted(
+        get_spans(annotations_a, 0) + get_spans(annotations_b, 1),
+        key=lambda span: span[0],
+    )
+
+    pairs = OrderedDict()
+    active_spans = ([], [])
+    for start, end, side, i in spans:
+        # spans of the other group which ended before this one started
+        # can't overlap it or any span after it
+        other_spans = [
+            other_span
+            for other_span in active_spans[1 - side]
+            if other_span[1] > start
+        ]
+        active_spans[1 - side][:] = other_spans
+        for _, _, _, j in other_spans:
+            pairs[(i, j) if side == 0 else (j, i)] = None
+        active_spans[side].append((start, end, side, i))
+
+    return [
+        (annotations_a[i], annotations_b[j])
+        for i, j in pairs
+        if relation is None
+        or is_related(
+            annotations_a[i].concatenated_char_set,
+            annotations_b[j].concatenated_char_set,
+        )
     ]
 
 def is_overlapping(annotations):
@@ -1198,13 +3614,15 @@ def is_overlapping(annotations):
 
 def normalize(text,
               regex_restrictions=[],
-              verbose=False):
+              verbose=False,
+              track_offsets=False):
     """
     Returns *text*, less all non-linguistic text (e.g. overlap brackets,
     speaker notation, etc.). Defaults to the regular expressions in
     :data:`gatenlphiltlab.regex_patterns.regexes`, but a specific selection of
     patterns and replacements can be made by listing the names of the desired
-    regexes as *regex_restrictions*.
+    regexes as *regex_restrictions*. Each selection is compiled once, see
+    :func:`gatenlphiltlab.normalization.get_normalizer`.
 
     :param text: The text to normalize.
     :type text: string
@@ -1214,21 +3632,16 @@ def normalize(text,
 
     :param verbose: Print the regex matches to the console.
     :type verbose: bool
+
+    :param track_offsets: (optional). Record each substitution as it is made, and also return a :class:`~gatenlphiltlab.diff.ChangeTree` from *text* to the normalized text, e.g. for :func:`~gatenlphiltlab.diff.align_annotations`, without diffing the texts.
+    :type track_offsets: bool
+
+    :returns: The normalized text, and its change tree if *track_offsets* is set.
+    :rtype: string or tuple(string, :class:`~gatenlphiltlab.diff.ChangeTree`)
     """
-    matches = set()
-    cleaned_text = text
-    if regex_restrictions:
-        target_regexes = [
-            regex
-            for regex in regex_patterns.regexes
-            if regex.name in regex_restrictions
-        ]
-    else:
-        target_regexes = regex_patterns.regexes
-    for regex in target_regexes:
-        cleaned_text = regex.expression.sub(regex.replacement, cleaned_text)
-        if verbose:
-            matches.add(regex.name)
+    normalizer = normalization.get_normalizer(
+        tuple(sorted(set(regex_restrictions)))
+    )
     if verbose:
-        print(matches)
-    return cleaned_text
+        print(set(regex.name for regex in normalizer.regexes))
+    return normalizer.normalize(text, track_offsets)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+An on-disk cache of parsed GATE annotation documents, so that the text, node
+offsets, and annotation columns of an unchanged document need not be parsed
+from its XML again.
+"""
+
+import os
+import json
+import struct
+import hashlib
+import tempfile
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CachedAnnotationSet = namedtuple(
+    "CachedAnnotationSet",
+    [
+        "name",
+        "type_names",
+        "ids",
+        "starts",
+        "ends",
+        "type_codes",
+    ]
+)
+
+CachedDocument = namedtuple(
+    "CachedDocument",
+    [
+        "text",
+        "nodes",
+        "annotation_sets",
+    ]
+)
+CachedDocument.__doc__ = """
+The contents of a cache entry. *nodes* is a sorted numpy array of node
+offsets, and *annotation_sets* a list of
+:class:`~gatenlphiltlab.cache.CachedAnnotationSet` in document order.
+"""
+
+_MAGIC = b"GATENLPCACHE"
+_VERSION = 1
+_HEADER_LENGTH = struct.Struct("<Q")
+_SUFFIX = ".gatecache"
+
+# fixed byte order, so that cache files can be shared between machines
+_INT64 = "<i8"
+_INT32 = "<i4"
+
+
+def _get_file_hash(filename,
+                   chunk_size=1 << 20):
+    file_hash = hashlib.sha256()
+    with open(filename, "rb") as document_file:
+        for chunk in iter(lambda: document_file.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+class DocumentCache:
+    """
+    A cache of parsed annotation documents, stored in a compact binary format
+    either beside each document or in a cache directory. An entry is keyed by
+    the document's path, and is reused for as long as the document's
+    modification time and size are unchanged, or, failing that, its content
+    hash is. Pass an instance as the *cache* argument of
+    :class:`~gatenlphiltlab.AnnotationFile`.
+
+    :parameter directory: (optional). The directory in which to keep cache files. If *None*, each document's cache file is written beside it, with the suffix ".gatecache".
+    :type directory: string
+
+    :parameter max_bytes: (optional). The total size that the cache files in *directory* may reach before the least recently used ones are evicted. Ignored if *directory* is *None*.
+    :type max_bytes: int
+    """
+    def __init__(self,
+                 directory=None,
+                 max_bytes=1 << 30):
+        if numpy is None:
+            raise ImportError("The document cache requires numpy.")
+        self._directory = directory
+        self._max_bytes = max_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return "DocumentCache({!r})".format(self._directory)
+
+    @property
+    def directory(self):
+        """
+        :type: string
+        """
+        return self._directory
+
+    def get_cache_path(self,
+                       filename):
+        """
+        :returns: The path of the cache file for the document at *filename*.
+        :rtype: string
+        """
+        path = os.path.abspath(filename)
+        if self._directory is None:
+            return path + _SUFFIX
+        key = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, key + _SUFFIX)
+
+    def load(self,
+             filename):
+        """
+        Read the cache entry of the document at *filename*.
+
+        :returns: The cached document, or *None* if there is no valid entry for the document as it currently is.
+        :rtype: :class:`~gatenlphiltlab.cache.CachedDocument`
+        """
+        cache_path = self.get_cache_path(filename)
+        try:
+            with open(cache_path, "rb") as cache_file:
+                data = cache_file.read()
+            header, payload_start = self._read_header(data)
+            if not self._is_current(header, filename):
+                return None
+            document = self._read_payload(header, data, payload_start)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return None
+        if self._directory is not None:
+            # record the use for eviction
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+        return document
+
+    def store(self,
+              annotation_file):
+        """
+        Write a cache entry for *annotation_file*, which must have been loaded
+        with *columnar* enabled, replacing any previous entry for its document.
+
+        :param annotation_file: The annotation file to cache.
+        :type annotation_file: :class:`~gatenlphiltlab.AnnotationFile`
+        """
+        filename = annotation_file.filename
+        status = os.stat(filename)
+        text = annotation_file.text.encode("utf-8")
+        nodes = numpy.asarray(annotation_file._nodes_list, dtype=_INT64)
+
+        set_headers = []
+        chunks = [text, nodes.tobytes()]
+        for annotation_set in annotation_file.annotation_sets:
+            columns = annotation_set.columns
+            alive = columns.alive
+            set_headers.append(
+                {
+                    "name": annotation_set.name,
+                    "type_names": columns.type_names,
+                    "rows": int(alive.sum()),
+                }
+            )
+            chunks.extend(
+                [
+                    columns.ids[alive].astype(_INT64).tobytes(),
+                    columns.starts[alive].astype(_INT64).tobytes(),
+                    columns.ends[alive].astype(_INT64).tobytes(),
+                    columns.type_codes[alive].astype(_INT32).tobytes(),
+                ]
+            )
+        header = json.dumps(
+            {
+                "version": _VERSION,
+                "path": os.path.abspath(filename),
+                "mtime_ns": status.st_mtime_ns,
+                "size": status.st_size,
+                "sha256": _get_file_hash(filename),
+                "text_bytes": len(text),
+                "nodes": len(nodes),
+                "annotation_sets": set_headers,
+            }
+        ).encode("utf-8")
+
+        cache_path = self.get_cache_path(filename)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path),
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                cache_file.write(_MAGIC)
+                cache_file.write(_HEADER_LENGTH.pack(len(header)))
+                cache_file.write(header)
+                for chunk in chunks:
+                    cache_file.write(chunk)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        if self._directory is not None:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used cache files from :attr:`directory`
+        until their total size is within *max_bytes*.
+        """
+        if self._directory is None:
+            return
+        entries = []
+        total = 0
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(_SUFFIX):
+                continue
+            try:
+                status = entry.stat()
+            except OSError:
+                continue
+            entries.append((status.st_mtime_ns, status.st_size, entry.path))
+            total += status.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _read_header(self,
+                     data):
+        if not data.startswith(_MAGIC):
+            raise ValueError("Not a document cache file.")
+        position = len(_MAGIC)
+        header_length, = _HEADER_LENGTH.unpack_from(data, position)
+        position += _HEADER_LENGTH.size
+        header = json.loads(
+            data[position:position + header_length].decode("utf-8")
+        )
+        if header["version"] != _VERSION:
+            raise ValueError("Unsupported document cache version.")
+        return header, position + header_length
+
+    def _is_current(self,
+                    header,
+                    filename):
+        if header["path"] != os.path.abspath(filename):
+            return False
+        status = os.stat(filename)
+        if (header["mtime_ns"] == status.st_mtime_ns
+                and header["size"] == status.st_size):
+            return True
+        # the file was touched or copied, but may not have changed
+        return (
+            header["size"] == status.st_size
+            and header["sha256"] == _get_file_hash(filename)
+        )
+
+    def _read_payload(self,
+                      header,
+                      data,
+                      position):
+        def read_array(dtype,
+                       count):
+            nonlocal position
+            array = numpy.frombuffer(
+                data,
+                dtype=dtype,
+                count=count,
+                offset=position,
+            )
+            position += array.nbytes
+            # copy out of the read-only buffer, in native byte order
+            return array.astype(array.dtype.newbyteorder("="))
+
+        text_end = position + header["text_bytes"]
+        text = data[position:text_end].decode("utf-8")
+        position = text_end
+        nodes = read_array(_INT64, header["nodes"])
+        annotation_sets = []
+        for set_header in header["annotation_sets"]:
+            rows = set_header["rows"]
+            annotation_sets.append(
+                CachedAnnotationSet(
+                    set_header["name"],
+                    set_header["type_names"],
+                    read_array(_INT64, rows),
+                    read_array(_INT64, rows),
+                    read_array(_INT64, rows),
+                    read_array(_INT32, rows),
+                )
+            )
+        if position != len(data):
+            raise ValueError("Truncated or corrupt document cache file.")
+        return CachedDocument(text, nodes, annotation_sets)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Run functions over many GATE annotation documents at once, spreading the
+work over a pool of processes.
+"""
+
+import os
+import glob
+import functools
+import traceback
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import gatenlphiltlab
+
+
+CorpusResult = namedtuple(
+    "CorpusResult",
+    [
+        "filename",
+        "value",
+        "error",
+    ]
+)
+CorpusResult.__doc__ = """
+The outcome of running a function on one document of a
+:class:`~gatenlphiltlab.corpus.Corpus`. *error* is *None* on success, and
+otherwise a formatted traceback (or a note that the worker process was
+lost), in which case *value* is *None*.
+"""
+
+_WORKER_LOST = "The worker process was lost while processing this file.\n"
+
+_NO_INITIAL = object()
+
+
+def _process_files(function,
+                   filenames,
+                   annotation_file_options):
+    results = []
+    for filename in filenames:
+        try:
+            annotation_file = gatenlphiltlab.AnnotationFile(
+                filename,
+                **annotation_file_options
+            )
+            results.append(
+                CorpusResult(filename, function(annotation_file), None)
+            )
+        except Exception:
+            results.append(
+                CorpusResult(filename, None, traceback.format_exc())
+            )
+    return results
+
+def _map_files(process_files,
+               filenames,
+               processes,
+               chunksize,
+               ordered):
+    # Call *process_files* on chunks of *filenames* in a pool of worker
+    # processes, yielding the CorpusResult it returns for each file. See
+    # Corpus.map.
+    processes = processes or os.cpu_count() or 1
+    chunks = [
+        filenames[i:i + chunksize]
+        for i in range(0, len(filenames), chunksize)
+    ]
+    chunk_results = [ [None] * len(chunk) for chunk in chunks ]
+    unfinished = [ len(chunk) for chunk in chunks ]
+    # jobs are (chunk index, offset within the chunk, filenames, retry)
+    jobs = deque(
+        (i, 0, chunk, False)
+        for i, chunk in enumerate(chunks)
+    )
+    retry_jobs = deque()
+    next_chunk = 0
+    running = {}
+    executor = ProcessPoolExecutor(processes)
+
+    def submit(job):
+        future = executor.submit(process_files, job[2])
+        running[future] = job
+
+    try:
+        while jobs or retry_jobs or running:
+            if retry_jobs:
+                # run retries in isolation, so that a crash can only be
+                # caused by the file being retried
+                if not running:
+                    submit(retry_jobs.popleft())
+            else:
+                while jobs and len(running) < 2 * processes:
+                    submit(jobs.popleft())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            while done:
+                for future in done:
+                    i, offset, job_filenames, retry = running.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        pool_broken = True
+                        if retry:
+                            results = [
+                                CorpusResult(filename, None, _WORKER_LOST)
+                                for filename in job_filenames
+                            ]
+                        else:
+                            retry_jobs.extend(
+                                (i, offset + j, [filename], True)
+                                for j, filename in enumerate(job_filenames)
+                            )
+                            continue
+                    except Exception:
+                        error = traceback.format_exc()
+                        results = [
+                            CorpusResult(filename, None, error)
+                            for filename in job_filenames
+                        ]
+
+                    chunk_results[i][offset:offset + len(results)] = results
+                    unfinished[i] -= len(results)
+                    if not ordered:
+                        for result in results:
+                            yield result
+
+                # every other job in a broken pool fails too, so collect
+                # them all before starting a new pool
+                done = set(running) if pool_broken else set()
+                if done:
+                    wait(done)
+
+            if pool_broken:
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(processes)
+
+            if ordered:
+                while next_chunk < len(chunks) and not unfinished[next_chunk]:
+                    for result in chunk_results[next_chunk]:
+                        yield result
+                    chunk_results[next_chunk] = None
+                    next_chunk += 1
+    finally:
+        executor.shutdown(wait=True)
+
+class Corpus:
+    """
+    A collection of GATE XML annotation documents.
+
+    :parameter source: A directory containing the documents, a glob pattern matching them, or an iterable of their paths.
+    :type source: string or iterable(string)
+
+    :parameter pattern: (optional). The glob pattern to match files against when *source* is a directory.
+    :type pattern: string
+
+    :parameter annotation_file_options: Keyword arguments with which to construct each :class:`~gatenlphiltlab.AnnotationFile`, e.g. ``streaming=True``.
+    """
+    def __init__(self,
+                 source,
+                 pattern="*.xml",
+                 **annotation_file_options):
+        if isinstance(source, str):
+            if os.path.isdir(source):
+                source = os.path.join(source, pattern)
+            self._filenames = sorted(glob.glob(source))
+        else:
+            self._filenames = list(source)
+        self._annotation_file_options = annotation_file_options
+
+    def __repr__(self):
+        return "Corpus({} files)".format(len(self))
+
+    def __len__(self):
+        return len(self._filenames)
+
+    def __iter__(self):
+        for filename in self._filenames:
+            yield gatenlphiltlab.AnnotationFile(
+                filename,
+                **self._annotation_file_options
+            )
+
+    @property
+    def filenames(self):
+        """
+        :type: list(string)
+        """
+        return list(self._filenames)
+
+    def map(self,
+            function,
+            processes=None,
+            chunksize=1,
+            ordered=True):
+        """
+        Call *function* on the :class:`~gatenlphiltlab.AnnotationFile` of
+        each document in a pool of *processes* worker processes.
+
+        A document which fails to parse, or for which *function* raises, is
+        reported in its result without affecting the others. If a worker
+        process dies, every file that was in progress is retried on its own
+        in a fresh pool, with nothing else running alongside it, and a file
+        which is lost again is reported as such.
+
+        :param function: A picklable (i.e. module level) function taking a :class:`~gatenlphiltlab.AnnotationFile`. Its return value must be picklable.
+        :type function: function
+
+        :param processes: (optional). The number of worker processes. Defaults to the number of CPUs.
+        :type processes: int
+
+        :param chunksize: (optional). The number of documents sent to a worker at a time.
+        :type chunksize: int
+
+        :param ordered: (optional). Yield results in the order of :attr:`filenames`, rather than as they complete.
+        :type ordered: bool
+
+        :rtype: iterator of :class:`~gatenlphiltlab.corpus.CorpusResult`
+        """
+        return _map_files(
+            functools.partial(
+                _process_files,
+                function,
+                annotation_file_options=self._annotation_file_options,
+            ),
+            self._filenames,
+            processes,
+            chunksize,
+            ordered,
+        )
+
+    def map_reduce(self,
+                   function,
+                   reducer,
+                   initial=_NO_INITIAL,
+                   **map_options):
+        """
+        :meth:`~gatenlphiltlab.corpus.Corpus.map` *function* over the
+        corpus, combining the values of all successful results with
+        *reducer* as they complete, as :func:`functools.reduce` would.
+
+        :param function: See :meth:`~gatenlphiltlab.corpus.Corpus.map`.
+        :type function: function
+
+        :param reducer: A function of two values returning their combination.
+        :type reducer: function
+
+        :param initial: (optional). The value to start the reduction with, and the value returned when no document succeeds, which is otherwise *None*.
+
+        :param map_options: Keyword arguments passed to :meth:`~gatenlphiltlab.corpus.Corpus.map`.
+
+        :returns: The reduced value, and the results of any documents which failed.
+        :rtype: tuple(object, list(:class:`~gatenlphiltlab.corpus.CorpusResult`))
+        """
+        map_options.setdefault("ordered", False)
+        failures = []
+
+        def get_values():
+            for result in self.map(function, **map_options):
+                if result.error is None:
+                    yield result.value
+                else:
+                    failures.append(result)
+
+        values = get_values()
+        if initial is _NO_INITIAL:
+            # start with the first value, so that an empty corpus, or one in
+            # which every document fails, reduces to None
+            initial = next(values, None)
+        value = functools.reduce(reducer, values, initial)
+        return value, failures
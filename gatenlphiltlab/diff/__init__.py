@@ -5,28 +5,139 @@ from collections import namedtuple
 from collections import OrderedDict
 import itertools
 import bisect
+import time
 import difflib
 import intervaltree
 import Levenshtein
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+from . import myers
 
-def get_change_tree(text1,
-                     text2):
-    change_tree = intervaltree.IntervalTree()
+
+def get_difflib_matching_blocks(text1,
+                                text2):
+    """
+    Find the blocks of text which *text1* and *text2* have in common using
+    :class:`difflib.SequenceMatcher`, character by character.
+
+    :rtype: list(difflib.Match)
+    """
     # setting autojunk to True will greatly shorten processing time
     # at the expense of accuracy.
     seq = difflib.SequenceMatcher(None, text1, text2, autojunk=False)
-    matching_blocks = seq.get_matching_blocks()
+    return seq.get_matching_blocks()
+
+engines = {
+    "difflib": get_difflib_matching_blocks,
+    "myers": myers.get_matching_blocks,
+}
+"""
+The available diff engines by name. An engine is a function of *text1* and
+*text2* returning their matching blocks as
+:meth:`difflib.SequenceMatcher.get_matching_blocks` does. "difflib" compares
+the texts character by character and is slow on long texts; "myers" compares
+lines first and only refines the changed regions, see
+:mod:`gatenlphiltlab.diff.myers`.
+"""
+
+default_engine = "difflib"
+"""
+The name of the engine used when none is given.
+"""
+
+def get_matching_blocks(text1,
+                        text2,
+                        engine=None):
+    """
+    Find the blocks of text which *text1* and *text2* have in common.
+
+    :param engine: (optional). The name of one of :data:`engines`, or an engine function. Defaults to :data:`default_engine`.
+    :type engine: string or function
+
+    :rtype: list(difflib.Match)
+    """
+    if engine is None:
+        engine = default_engine
+    if not callable(engine):
+        try:
+            engine = engines[engine]
+        except KeyError:
+            raise ValueError("Unknown diff engine: {}".format(engine))
+    return engine(text1, text2)
+
+def get_change_tree(text1,
+                    text2,
+                    engine=None):
+    return _get_change_tree(get_matching_blocks(text1, text2, engine))
+
+def _get_change_tree(matching_blocks):
+    change_tree = intervaltree.IntervalTree()
     for block in matching_blocks:
-        difference = block.b - block.a
-        if block.size != 0:
+        difference = block[1] - block[0]
+        if block[2] != 0:
             change_tree.addi(
-                block.a,
-                block.a + block.size + 1,
+                block[0],
+                block[0] + block[2] + 1,
                 difference,
             )
     return change_tree
 
+def compose_matching_blocks(matching_blocks1,
+                            matching_blocks2):
+    """
+    Given the matching blocks from a text *a* to a text *b*, and from *b* to
+    a text *c*, return the matching blocks from *a* to *c*, i.e. the text
+    which is common to all three.
+
+    :param matching_blocks1: The matching blocks from *a* to *b*, in order.
+    :type matching_blocks1: list(difflib.Match)
+
+    :param matching_blocks2: The matching blocks from *b* to *c*, in order.
+    :type matching_blocks2: list(difflib.Match)
+
+    :rtype: list(difflib.Match)
+    """
+    blocks = []
+    i = j = 0
+    while i < len(matching_blocks1) and j < len(matching_blocks2):
+        a1, b1, size1 = matching_blocks1[i]
+        b2, c2, size2 = matching_blocks2[j]
+        start = max(b1, b2)
+        end = min(b1 + size1, b2 + size2)
+        if start < end:
+            a = a1 + start - b1
+            c = c2 + start - b2
+            size = end - start
+            if blocks:
+                last_a, last_c, last_size = blocks[-1]
+                if last_a + last_size == a and last_c + last_size == c:
+                    # join blocks which are contiguous in both texts
+                    a, c, size = last_a, last_c, last_size + size
+                    blocks.pop()
+            blocks.append((a, c, size))
+        if b1 + size1 <= b2 + size2:
+            i += 1
+        else:
+            j += 1
+    # both end with a block of size 0 at the end of their texts
+    blocks.append((matching_blocks1[-1][0], matching_blocks2[-1][1], 0))
+    return [ difflib.Match(*block) for block in blocks ]
+
+FuzzyStatistics = namedtuple(
+    "FuzzyStatistics",
+    [
+        "annotations",
+        "seconds",
+    ]
+)
+FuzzyStatistics.__doc__ = """
+The number of annotations a :class:`~gatenlphiltlab.diff.ChangeTree` has had
+to resolve by fuzzy matching, and the total time spent doing so.
+"""
+
 class ChangeTree():
     """
     An `interval tree <https://en.wikipedia.org/wiki/Interval_tree>`_ which
@@ -40,13 +151,32 @@ class ChangeTree():
     text within *text2*.
 
     Based on `intervaltree <https://pypi.python.org/pypi/intervaltree>`_.
+
+    :parameter engine: (optional). The diff engine with which to compare the texts. See :func:`~gatenlphiltlab.diff.get_matching_blocks`.
+    :type engine: string or function
+
+    :parameter window: (optional). Bound the fuzzy matching of annotations whose text was changed to boundaries within *window* characters of the boundaries first estimated. By default every pair of boundaries is tried.
+    :type window: int
+
+    :parameter matching_blocks: (optional). The blocks of text common to *text1* and *text2*, if already known, e.g. from :func:`gatenlphiltlab.normalize`, in which case the texts aren't diffed.
+    :type matching_blocks: list(difflib.Match)
     """
     def __init__(self,
                  text1,
-                 text2):
+                 text2,
+                 engine=None,
+                 window=None,
+                 matching_blocks=None):
         self._text1 = text1
         self._text2 = text2
-        self._change_tree = get_change_tree(text1, text2)
+        self._engine = engine
+        self._window = window
+        self._inner_trees = {}
+        self._fuzzy_annotations = 0
+        self._fuzzy_seconds = 0.0
+        if matching_blocks is None:
+            matching_blocks = get_matching_blocks(text1, text2, engine)
+        self._change_tree = _get_change_tree(matching_blocks)
         self._interval_tree_start_points = sorted(
             [
                 interval.begin
@@ -59,6 +189,80 @@ class ChangeTree():
                 for interval in self._change_tree
             ]
         )
+        # the blocks in order, each covering the offsets from its start to
+        # its end inclusive, for remapping offsets in bulk
+        blocks = sorted(self._change_tree)
+        self._block_starts = [ block.begin for block in blocks ]
+        self._block_ends = [ block.end - 1 for block in blocks ]
+        self._block_deltas = [ block.data for block in blocks ]
+        if numpy is not None:
+            self._block_starts = numpy.array(
+                self._block_starts,
+                dtype=numpy.int64,
+            )
+            self._block_ends = numpy.array(
+                self._block_ends,
+                dtype=numpy.int64,
+            )
+            self._block_deltas = numpy.array(
+                self._block_deltas,
+                dtype=numpy.int64,
+            )
+
+    def remap_offsets(self,
+                      offsets):
+        """
+        Map each of *offsets* in *text1* to the corresponding offset in
+        *text2*, wherever the offset lies within, or at the edge of, a block
+        of text common to both. Where two blocks share an edge, the earlier
+        block is used, as in
+        :meth:`~gatenlphiltlab.diff.ChangeTree.get_changed_annotation_nodes`.
+
+        :param offsets: The offsets in *text1*.
+        :type offsets: iterable of int
+
+        :returns: The remapped offsets, with unchanged values where an offset could not be remapped, and whether each offset was remapped.
+        :rtype: tuple(list(int), list(bool))
+        """
+        if numpy is not None:
+            offsets = numpy.fromiter(offsets, dtype=numpy.int64)
+            if not len(self._block_ends):
+                return offsets.tolist(), [False] * len(offsets)
+            # the first block ending at or after each offset is the earliest
+            # which could contain it
+            blocks = numpy.searchsorted(self._block_ends, offsets, side="left")
+            remapped = blocks < len(self._block_ends)
+            blocks[~remapped] = 0
+            remapped &= self._block_starts[blocks] <= offsets
+            new_offsets = offsets + numpy.where(
+                remapped,
+                self._block_deltas[blocks],
+                0,
+            )
+            return new_offsets.tolist(), remapped.tolist()
+
+        new_offsets = []
+        remapped = []
+        for offset in offsets:
+            block = bisect.bisect_left(self._block_ends, offset)
+            if (block < len(self._block_ends)
+                    and self._block_starts[block] <= offset):
+                new_offsets.append(offset + self._block_deltas[block])
+                remapped.append(True)
+            else:
+                new_offsets.append(offset)
+                remapped.append(False)
+        return new_offsets, remapped
+
+    @property
+    def fuzzy_statistics(self):
+        """
+        How many annotations have needed fuzzy matching to be resolved, and
+        how long that took.
+
+        :type: :class:`~gatenlphiltlab.diff.FuzzyStatistics`
+        """
+        return FuzzyStatistics(self._fuzzy_annotations, self._fuzzy_seconds)
 
     def get_lt_interval(self,
                         node):
@@ -173,21 +377,14 @@ class ChangeTree():
             new_start_node = longest_valid_combination[0]
             new_end_node = longest_valid_combination[1]
         else: 
-            inner_tree = ChangeTree(candidate_text, intended_text)
-            closest_pair = max(
-                itertools.combinations(
-                    inner_tree._interval_tree_start_points
-                    + inner_tree._interval_tree_end_points,
-                    2
-                ),
-                key=lambda x: Levenshtein.ratio(
-                    self._text2[
-                        longest_valid_combination[0] + x[0]
-                        :longest_valid_combination[0] + x[1]
-                    ],
-                    intended_text
-                ),
+            started = time.perf_counter()
+            closest_pair = self._get_closest_pair(
+                candidate_text,
+                intended_text,
+                longest_valid_combination[0],
             )
+            self._fuzzy_annotations += 1
+            self._fuzzy_seconds += time.perf_counter() - started
 
             new_start_node = longest_valid_combination[0] + closest_pair[0]
             new_end_node = longest_valid_combination[0] + closest_pair[1]
@@ -203,6 +400,100 @@ class ChangeTree():
 
         return (new_start_node, new_end_node)
 
+    def _get_inner_tree(self,
+                        candidate_text,
+                        intended_text):
+        key = (candidate_text, intended_text)
+        inner_tree = self._inner_trees.get(key)
+        if inner_tree is None:
+            inner_tree = ChangeTree(
+                candidate_text,
+                intended_text,
+                self._engine,
+            )
+            self._inner_trees[key] = inner_tree
+        return inner_tree
+
+    def _get_closest_pair(self,
+                          candidate_text,
+                          intended_text,
+                          candidate_start):
+        # Find the pair of boundaries within the candidate text which best
+        # matches the intended text, from the edges of its changes.
+        inner_tree = self._get_inner_tree(candidate_text, intended_text)
+        points = (
+            inner_tree._interval_tree_start_points
+            + inner_tree._interval_tree_end_points
+        )
+        pairs = itertools.combinations(points, 2)
+        if self._window is not None:
+            window = self._window
+            candidate_end = len(candidate_text)
+            points = list(OrderedDict.fromkeys(points))
+            pairs = (
+                pair
+                for pair in itertools.combinations(points, 2)
+                if pair[0] < pair[1]
+                and abs(pair[0]) <= window
+                and abs(pair[1] - candidate_end) <= window
+            )
+
+        closest_pair = None
+        closest_ratio = -1
+        for pair in pairs:
+            ratio = Levenshtein.ratio(
+                self._text2[
+                    candidate_start + pair[0]
+                    :candidate_start + pair[1]
+                ],
+                intended_text
+            )
+            if ratio > closest_ratio:
+                closest_pair = pair
+                closest_ratio = ratio
+                if ratio == 1:
+                    # nothing can match better than the intended text itself
+                    break
+        if closest_pair is None:
+            # no boundaries to choose from, so keep the candidate as it is
+            closest_pair = (0, len(candidate_text))
+        return closest_pair
+
+    def get_changed_annotations_nodes(self,
+                                      annotations):
+        """
+        Like :meth:`~gatenlphiltlab.diff.ChangeTree.get_changed_annotation_nodes`
+        for many annotations at once. The offsets of all *annotations* are
+        remapped with :meth:`~gatenlphiltlab.diff.ChangeTree.remap_offsets`,
+        and only the annotations whose text was changed, i.e. those whose
+        start or end node lies outside of the common text or whose length
+        would change, are resolved one at a time.
+
+        :param annotations: The annotations.
+        :type annotations: iterable of :class:`gatenlphiltlab.Annotation`
+
+        :returns: The (start_node, end_node) of each annotation.
+        :rtype: list(tuple(int, int))
+        """
+        annotations = list(annotations)
+        start_nodes = [ annotation.start_node for annotation in annotations ]
+        end_nodes = [ annotation.end_node for annotation in annotations ]
+        new_start_nodes, start_nodes_remapped = self.remap_offsets(start_nodes)
+        new_end_nodes, end_nodes_remapped = self.remap_offsets(end_nodes)
+
+        changed_nodes = []
+        for i, annotation in enumerate(annotations):
+            if (start_nodes_remapped[i]
+                    and end_nodes_remapped[i]
+                    and (new_start_nodes[i] - start_nodes[i]
+                         == new_end_nodes[i] - end_nodes[i])):
+                changed_nodes.append((new_start_nodes[i], new_end_nodes[i]))
+            else:
+                changed_nodes.append(
+                    self.get_changed_annotation_nodes(annotation)
+                )
+        return changed_nodes
+
 def align_annotation(annotation,
                      change_tree):
     """
@@ -232,8 +523,11 @@ def align_annotations(annotations,
     :param change_tree: The change tree to use for change lookups.
     :type change_tree: :class:`~gatenlphiltlab.diff.ChangeTree`
     """
-    for annotation in annotations:
-        align_annotation(annotation, change_tree)
+    annotations = list(annotations)
+    changed_nodes = change_tree.get_changed_annotations_nodes(annotations)
+    for annotation, (start_node, end_node) in zip(annotations, changed_nodes):
+        annotation.start_node = start_node
+        annotation.end_node = end_node
 
 def assure_nodes(annotations,
                  annotation_file):
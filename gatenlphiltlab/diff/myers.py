@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+A linear-space implementation of Myers' O(ND) difference algorithm (`An
+O(ND) Difference Algorithm and Its Variations
+<http://www.xmailserver.org/diff2.pdf>`_), used as a diff engine for
+:class:`~gatenlphiltlab.diff.ChangeTree`.
+
+Texts are first compared line by line, and only the regions between matching
+lines are compared character by character, so the cost grows with the size
+of the changes rather than with the length of the texts.
+"""
+
+import difflib
+
+
+def get_matching_blocks(text1,
+                        text2):
+    """
+    Find the blocks of text which *text1* and *text2* have in common, in the
+    same form as :meth:`difflib.SequenceMatcher.get_matching_blocks`.
+
+    :param text1: The original text.
+    :type text1: string
+
+    :param text2: The changed text.
+    :type text2: string
+
+    :returns: Non-overlapping blocks in increasing order, ending with a block of size 0 at the end of both texts.
+    :rtype: list(difflib.Match)
+    """
+    lines1 = text1.splitlines(keepends=True)
+    lines2 = text2.splitlines(keepends=True)
+    line_codes = {}
+    codes1 = [ line_codes.setdefault(line, len(line_codes)) for line in lines1 ]
+    codes2 = [ line_codes.setdefault(line, len(line_codes)) for line in lines2 ]
+    line_starts1 = _get_line_starts(lines1)
+    line_starts2 = _get_line_starts(lines2)
+
+    line_blocks = []
+    _diff(codes1, codes2, 0, 0, line_blocks)
+    line_blocks.sort()
+    line_blocks.append((len(lines1), len(lines2), 0))
+
+    blocks = []
+    a = b = 0
+    for line_a, line_b, size in line_blocks:
+        # compare the changed lines before this block character by character
+        changed_end1 = line_starts1[line_a]
+        changed_end2 = line_starts2[line_b]
+        changed_blocks = []
+        _diff(
+            text1[a:changed_end1],
+            text2[b:changed_end2],
+            a,
+            b,
+            changed_blocks,
+        )
+        changed_blocks.sort()
+        blocks.extend(changed_blocks)
+        a = line_starts1[line_a + size]
+        b = line_starts2[line_b + size]
+        if size:
+            blocks.append((changed_end1, changed_end2, a - changed_end1))
+
+    matching_blocks = []
+    for a, b, size in blocks:
+        if matching_blocks:
+            last_a, last_b, last_size = matching_blocks[-1]
+            if last_a + last_size == a and last_b + last_size == b:
+                matching_blocks[-1] = (last_a, last_b, last_size + size)
+                continue
+        matching_blocks.append((a, b, size))
+    matching_blocks.append((len(text1), len(text2), 0))
+    return [ difflib.Match(*block) for block in matching_blocks ]
+
+def _get_line_starts(lines):
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line))
+    return line_starts
+
+def _diff(a,
+          b,
+          a_offset,
+          b_offset,
+          blocks):
+    # Append the matching blocks of sequences *a* and *b*, offset by
+    # *a_offset* and *b_offset*, to *blocks*, in no particular order.
+    prefix = _get_common_prefix_length(a, b)
+    if prefix:
+        blocks.append((a_offset, b_offset, prefix))
+        a = a[prefix:]
+        b = b[prefix:]
+        a_offset += prefix
+        b_offset += prefix
+    suffix = _get_common_suffix_length(a, b)
+    if suffix:
+        blocks.append((a_offset + len(a) - suffix, b_offset + len(b) - suffix, suffix))
+        a = a[:len(a) - suffix]
+        b = b[:len(b) - suffix]
+    if not a or not b:
+        return
+
+    split = _get_middle_snake(a, b)
+    if split is None:
+        # nothing in common
+        return
+    x, y = split
+    _diff(a[:x], b[:y], a_offset, b_offset, blocks)
+    _diff(a[x:], b[y:], a_offset + x, b_offset + y, blocks)
+
+def _get_common_prefix_length(a,
+                              b):
+    length = min(len(a), len(b))
+    i = 0
+    while i < length and a[i] == b[i]:
+        i += 1
+    return i
+
+def _get_common_suffix_length(a,
+                              b):
+    length = min(len(a), len(b))
+    i = 0
+    while i < length and a[-1 - i] == b[-1 - i]:
+        i += 1
+    return i
+
+def _get_middle_snake(a,
+                      b):
+    # Search for the furthest reaching paths from both ends at once, keeping
+    # only the current diagonals, and return the point at which they meet.
+    # *a* and *b* share no prefix or suffix.
+    n = len(a)
+    m = len(b)
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    length = 2 * max_d + 2
+    forward = [-1] * length
+    backward = [-1] * length
+    forward[offset + 1] = 0
+    backward[offset + 1] = 0
+    delta = n - m
+    # paths meet in the forward pass if delta is odd, else the backward one
+    check_forward = delta % 2 != 0
+    forward_start = forward_end = backward_start = backward_end = 0
+    for d in range(max_d):
+        for k in range(-d + forward_start, d + 1 - forward_end, 2):
+            k_offset = offset + k
+            if k == -d or (
+                    k != d and forward[k_offset - 1] < forward[k_offset + 1]):
+                x = forward[k_offset + 1]
+            else:
+                x = forward[k_offset - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            forward[k_offset] = x
+            if x > n:
+                forward_end += 2
+            elif y > m:
+                forward_start += 2
+            elif check_forward:
+                reverse_offset = offset + delta - k
+                if (0 <= reverse_offset < length
+                        and backward[reverse_offset] != -1
+                        and x >= n - backward[reverse_offset]):
+                    return x, y
+
+        for k in range(-d + backward_start, d + 1 - backward_end, 2):
+            k_offset = offset + k
+            if k == -d or (
+                    k != d and backward[k_offset - 1] < backward[k_offset + 1]):
+                x = backward[k_offset + 1]
+            else:
+                x = backward[k_offset - 1] + 1
+            y = x - k
+            while x < n and y < m and a[n - x - 1] == b[m - y - 1]:
+                x += 1
+                y += 1
+            backward[k_offset] = x
+            if x > n:
+                backward_end += 2
+            elif y > m:
+                backward_start += 2
+            elif not check_forward:
+                forward_offset = offset + delta - k
+                if (0 <= forward_offset < length
+                        and forward[forward_offset] != -1):
+                    forward_x = forward[forward_offset]
+                    forward_y = offset + forward_x - forward_offset
+                    if forward_x >= n - x:
+                        return forward_x, forward_y
+    return None
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Compiled selections of the regex replacements applied by
+:func:`gatenlphiltlab.normalize`.
+"""
+
+import os
+import io
+import re
+import functools
+import itertools
+import traceback
+
+from . import diff
+from . import regex_patterns
+from .corpus import CorpusResult, _map_files
+
+
+# Pattern strings which can only ever match a single character: a character
+# class, an escaped symbol, or a literal character. Anything else, e.g.
+# "\s", is conservatively treated as unknown.
+_single_character_pattern = re.compile(
+    r"""
+    (?P<character_class> \[ (?P<negated> \^ )? (?P<members> (?: [^\\\[\]] | \\. )+ ) \] )
+    | (?P<escaped_symbol> \\ [^A-Za-z0-9] )
+    | (?P<literal> [^.^$*+?{}\[\]\\|()] )
+    """,
+    re.VERBOSE,
+)
+
+# Pattern strings which can't match a newline, unless through a character
+# class or escape too involved to tell.
+_newline_pattern = re.compile(r"\\[sWDnAZxuUN0-7]|\[\^|\n")
+_anchor_pattern = re.compile(r"(?<!\\)[\^$]")
+# Pattern strings made up only of whitespace and anchors.
+_whitespace_only_pattern = re.compile(r"(?:\\[srnt]|[ \t^$+*?])+")
+_whitespace = re.compile(r"\s")
+
+# The ways in which the text may be split into chunks before a regex
+# replacement is applied to each chunk separately, with the same result as
+# applying it to the whole text. Each split is made at a newline, which is
+# left out of the chunks.
+_ANY_NEWLINE = "any newline"
+_ISOLATED_NEWLINE = "isolated newline"
+_NO_SPLIT = "no split"
+
+
+class Normalizer:
+    """
+    A sequence of regex replacements, compiled so that each call scans the
+    text as few times as possible. Consecutive replacements which each match
+    a single character, share their replacement and flags, and can't match
+    their own replacement are fused into a single pass, as applying them one
+    after the other is then the same as applying them at once. All other
+    replacements are applied in order, as before.
+
+    :parameter regexes: (optional). The regex replacements to apply, in order. Defaults to :data:`gatenlphiltlab.regex_patterns.regexes`.
+    :type regexes: iterable of :class:`gatenlphiltlab.regex_patterns.Regex`
+    """
+    def __init__(self,
+                 regexes=None):
+        if regexes is None:
+            regexes = regex_patterns.regexes
+        self._regexes = tuple(regexes)
+        self._passes = _fuse(self._regexes)
+        self._stages = [
+            (split, tuple(passes))
+            for split, passes in itertools.groupby(
+                self._passes,
+                key=_get_split,
+            )
+        ]
+
+    def __repr__(self):
+        return "Normalizer({} regexes in {} passes)".format(
+            len(self._regexes),
+            len(self._passes),
+        )
+
+    def __call__(self,
+                 text,
+                 track_offsets=False):
+        return self.normalize(text, track_offsets)
+
+    @property
+    def regexes(self):
+        """
+        The regex replacements, as given.
+
+        :type: tuple(:class:`gatenlphiltlab.regex_patterns.Regex`)
+        """
+        return self._regexes
+
+    @property
+    def passes(self):
+        """
+        The regex replacements as applied, after fusing.
+
+        :type: tuple(:class:`gatenlphiltlab.regex_patterns.Regex`)
+        """
+        return self._passes
+
+    def normalize(self,
+                  text,
+                  track_offsets=False):
+        """
+        Apply the replacements to *text*. See :func:`gatenlphiltlab.normalize`.
+
+        :param text: The text to normalize.
+        :type text: string
+
+        :param track_offsets: (optional). Also return a :class:`~gatenlphiltlab.diff.ChangeTree` from *text* to the normalized text.
+        :type track_offsets: bool
+
+        :returns: The normalized text, and its change tree if *track_offsets* is set.
+        :rtype: string or tuple(string, :class:`~gatenlphiltlab.diff.ChangeTree`)
+        """
+        if not track_offsets:
+            for regex in self._passes:
+                text = regex.expression.sub(regex.replacement, text)
+            return text
+
+        cleaned_text = text
+        matching_blocks = [ (0, 0, len(text)), (len(text), len(text), 0) ]
+        for regex in self._passes:
+            cleaned_text, substitution_blocks = _substitute(
+                regex,
+                cleaned_text,
+            )
+            matching_blocks = diff.compose_matching_blocks(
+                matching_blocks,
+                substitution_blocks,
+            )
+        change_tree = diff.ChangeTree(
+            text,
+            cleaned_text,
+            matching_blocks=matching_blocks,
+        )
+        return cleaned_text, change_tree
+
+    def iter_normalize(self,
+                       text,
+                       chunk_size=1 << 20):
+        """
+        Like :meth:`~gatenlphiltlab.normalization.Normalizer.normalize`, but
+        processing the text in chunks of around *chunk_size* characters and
+        yielding the normalized text as it goes, so that the whole text need
+        never be held in memory. Chunks are split at newlines which no
+        replacement can act across, e.g. for line-based replacements such as
+        "speaker_tag" at any newline, and for whitespace replacements such as
+        "leading_spaces" at newlines between non-whitespace characters, so
+        the result is the same as that of
+        :meth:`~gatenlphiltlab.normalization.Normalizer.normalize`. Where no
+        such newline can be found, more text is read into the chunk.
+
+        :param text: The text to normalize, or an iterable of consecutive pieces of it, e.g. a file opened with ``newline=""``.
+        :type text: string or iterable(string)
+
+        :param chunk_size: (optional). The number of characters to read before normalizing a chunk.
+        :type chunk_size: int
+
+        :returns: Consecutive pieces of the normalized text.
+        :rtype: iterator(string)
+        """
+        if isinstance(text, str):
+            text = io.StringIO(text, newline="")
+        pieces = iter(text)
+        for split, passes in self._stages:
+            pieces = _iter_normalized_chunks(pieces, split, passes, chunk_size)
+        return pieces
+
+@functools.lru_cache(maxsize=64)
+def get_normalizer(regex_restrictions=()):
+    """
+    :returns: The compiled :class:`~gatenlphiltlab.normalization.Normalizer` for the regexes of :data:`gatenlphiltlab.regex_patterns.regexes` named in *regex_restrictions*, or for all of them if none are. Normalizers are cached per selection.
+    :rtype: :class:`~gatenlphiltlab.normalization.Normalizer`
+
+    :param regex_restrictions: (optional). The names of the regexes to use.
+    :type regex_restrictions: tuple(string)
+    """
+    if not regex_restrictions:
+        return Normalizer()
+    return Normalizer(
+        regex
+        for regex in regex_patterns.regexes
+        if regex.name in regex_restrictions
+    )
+
+def normalize_file(input_path,
+                   output_path,
+                   regex_restrictions=(),
+                   chunk_size=1 << 20,
+                   encoding="utf-8"):
+    """
+    Normalize the plain text file at *input_path* into *output_path*,
+    streaming it through
+    :meth:`~gatenlphiltlab.normalization.Normalizer.iter_normalize`.
+
+    :param regex_restrictions: (optional). The names of the regexes to use. See :func:`~gatenlphiltlab.normalization.get_normalizer`.
+    :type regex_restrictions: tuple(string)
+
+    :param chunk_size: (optional). See :meth:`~gatenlphiltlab.normalization.Normalizer.iter_normalize`.
+    :type chunk_size: int
+
+    :param encoding: (optional). The encoding of both files.
+    :type encoding: string
+    """
+    normalizer = get_normalizer(tuple(regex_restrictions))
+    with open(input_path, encoding=encoding, newline="") as input_file:
+        with open(
+            output_path,
+            "w",
+            encoding=encoding,
+            newline="",
+        ) as output_file:
+            for piece in normalizer.iter_normalize(input_file, chunk_size):
+                output_file.write(piece)
+
+def _get_output_path(input_path,
+                     source_directory,
+                     output_directory):
+    return os.path.join(
+        output_directory,
+        os.path.relpath(os.path.abspath(input_path), source_directory),
+    )
+
+def _normalize_files(input_paths,
+                     source_directory,
+                     output_directory,
+                     options):
+    results = []
+    for input_path in input_paths:
+        output_path = _get_output_path(
+            input_path,
+            source_directory,
+            output_directory,
+        )
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            normalize_file(input_path, output_path, **options)
+        except Exception:
+            results.append(
+                CorpusResult(input_path, None, traceback.format_exc())
+            )
+        else:
+            results.append(CorpusResult(input_path, output_path, None))
+    return results
+
+def normalize_files(input_paths,
+                    output_directory,
+                    processes=None,
+                    **options):
+    """
+    :func:`~gatenlphiltlab.normalization.normalize_file` each of
+    *input_paths* into *output_directory*, in a pool of *processes* worker
+    processes. Each normalized file keeps the path of its input relative to
+    the deepest directory containing all of *input_paths*, so that files of
+    the same name in different directories don't overwrite each other. Files
+    are processed as by :meth:`~gatenlphiltlab.corpus.Corpus.map`: only a
+    few files per process are queued at a time, and each is streamed, so
+    memory use is bounded however large the corpus or its files, and a
+    worker process which dies only loses the files it was working on.
+
+    :param input_paths: The paths of the plain text files to normalize.
+    :type input_paths: iterable(string)
+
+    :param output_directory: The directory to write the normalized files to.
+    :type output_directory: string
+
+    :param processes: (optional). The number of worker processes. Defaults to the number of CPUs.
+    :type processes: int
+
+    :param options: Keyword arguments passed to :func:`~gatenlphiltlab.normalization.normalize_file`.
+
+    :returns: The result of each file as it completes, with the path of the normalized file as its value.
+    :rtype: iterator of :class:`~gatenlphiltlab.corpus.CorpusResult`
+    """
+    input_paths = list(input_paths)
+    absolute_paths = [
+        os.path.abspath(input_path)
+        for input_path in input_paths
+    ]
+    if len(set(absolute_paths)) < len(absolute_paths):
+        raise ValueError(
+            "The same file is given more than once, and would be written to"
+            " the same output path."
+        )
+    os.makedirs(output_directory, exist_ok=True)
+    if not input_paths:
+        return iter(())
+    source_directory = os.path.commonpath(
+        [ os.path.dirname(path) for path in absolute_paths ]
+    )
+    return _map_files(
+        functools.partial(
+            _normalize_files,
+            source_directory=source_directory,
+            output_directory=output_directory,
+            options=options,
+        ),
+        input_paths,
+        processes,
+        1,
+        False,
+    )
+
+def _get_split(regex):
+    # How the text may be split before applying *regex*.
+    expression = regex.expression
+    pattern = expression.pattern
+    anchors_at_lines = (
+        expression.flags & re.MULTILINE
+        or not _anchor_pattern.search(pattern)
+    )
+    if not anchors_at_lines:
+        return _NO_SPLIT
+    if (not expression.flags & re.DOTALL
+            and not _newline_pattern.search(pattern)):
+        # the newline is out of reach, so each line is independent
+        return _ANY_NEWLINE
+    if (_whitespace_only_pattern.fullmatch(pattern)
+            and not expression.search("x\nx")
+            and not regex.replacement.strip()):
+        # only whitespace is matched and replaced, so a newline between
+        # non-whitespace can't be reached, nor can its neighbours change
+        return _ISOLATED_NEWLINE
+    return _NO_SPLIT
+
+def _find_last_split(text,
+                     split,
+                     start):
+    # The index of the last newline from *start* in *text* at which it may
+    # be split, or -1.
+    if split == _NO_SPLIT:
+        return -1
+    end = len(text)
+    while True:
+        index = text.rfind("\n", start, end)
+        if index == -1 or split == _ANY_NEWLINE:
+            return index
+        if (0 < index < len(text) - 1
+                and not _whitespace.match(text, index - 1)
+                and not _whitespace.match(text, index + 1)):
+            return index
+        end = index
+
+def _iter_normalized_chunks(pieces,
+                            split,
+                            passes,
+                            chunk_size):
+    def normalize_chunk(text):
+        for regex in passes:
+            text = regex.expression.sub(regex.replacement, text)
+        return text
+
+    buffer = []
+    buffer_size = 0
+    # how far into the buffer there is known to be no split
+    searched = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffer_size += len(piece)
+        if buffer_size < chunk_size:
+            continue
+        text = "".join(buffer)
+        index = _find_last_split(text, split, max(searched - 1, 0))
+        if index == -1:
+            buffer = [text]
+            searched = len(text)
+            continue
+        yield normalize_chunk(text[:index]) + "\n"
+        rest = text[index + 1:]
+        buffer = [rest]
+        buffer_size = len(rest)
+        searched = 0
+    yield normalize_chunk("".join(buffer))
+
+def _get_character_class_members(pattern):
+    # The members of a character class matching the same characters as
+    # *pattern*, or None if there's no such class, or it isn't known.
+    match = _single_character_pattern.fullmatch(pattern)
+    if match is None or match.group("negated"):
+        return None
+    if match.group("character_class"):
+        return match.group("members")
+    if match.group("escaped_symbol"):
+        return match.group("escaped_symbol")
+    return re.escape(match.group("literal"))
+
+def _fuse(regexes):
+    passes = []
+    group = []
+    group_members = []
+
+    def flush():
+        if len(group) == 1:
+            passes.append(group[0])
+        elif group:
+            first = group[0]
+            passes.append(
+                regex_patterns.Regex(
+                    name="+".join(regex.name for regex in group),
+                    expression=re.compile(
+                        "[{}]".format("".join(group_members)),
+                        first.expression.flags,
+                    ),
+                    replacement=first.replacement,
+                )
+            )
+        del group[:]
+        del group_members[:]
+
+    for regex in regexes:
+        members = _get_character_class_members(regex.expression.pattern)
+        if members is None or regex.expression.search(regex.replacement):
+            flush()
+            passes.append(regex)
+            continue
+        if group and (
+                regex.replacement != group[0].replacement
+                or regex.expression.flags != group[0].expression.flags):
+            flush()
+        group.append(regex)
+        group_members.append(members)
+    flush()
+    return tuple(passes)
+
+def _substitute(regex,
+                text):
+    # Substitute as re.sub does, also returning the matching blocks of the
+    # text before and after.
+    blocks = []
+    # where the text following the last substitution begins, before and after
+    end = new_end = 0
+
+    def replace(match):
+        nonlocal end, new_end
+        replacement = match.expand(regex.replacement)
+        matched_text = match.group()
+        new_start = new_end + match.start() - end
+        # keep any text the replacement has in common with the match
+        prefix = 0
+        while (prefix < min(len(matched_text), len(replacement))
+               and matched_text[prefix] == replacement[prefix]):
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(matched_text), len(replacement)) - prefix
+               and matched_text[-1 - suffix] == replacement[-1 - suffix]):
+            suffix += 1
+        blocks.append((end, new_end, match.start() - end + prefix))
+        blocks.append(
+            (
+                match.end() - suffix,
+                new_start + len(replacement) - suffix,
+                suffix,
+            )
+        )
+        end = match.end()
+        new_end = new_start + len(replacement)
+        return replacement
+
+    new_text = regex.expression.sub(replace, text)
+    blocks.append((end, new_end, len(text) - end))
+    blocks.append((len(text), len(new_text), 0))
+    return new_text, [ block for block in blocks if block[2] ] + blocks[-1:]
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Select the annotations of a GATE annotation document by annotation set,
+type, feature values, and offsets. Each query is planned against the indexes
+which the document has, or can cheaply build, so that it examines as few
+annotations as possible rather than scanning them all.
+"""
+
+import itertools
+from collections import namedtuple
+
+import gatenlphiltlab
+
+
+QueryPlan = namedtuple(
+    "QueryPlan",
+    [
+        "index",
+        "cost",
+        "get_candidates",
+    ]
+)
+QueryPlan.__doc__ = """
+How a query will be answered. *index* names the access path: "scan",
+"set", "type", "feature", "interval", or "type_interval". *cost* is the estimated
+number of annotations to be examined, including the annotations indexed if
+the index has yet to be built. *get_candidates* returns an iterable of
+annotations, a superset of the query's results, when called without
+arguments.
+"""
+
+
+def _as_tuple(value,
+              key=None):
+    # without repeats, so that no annotation is selected twice
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return (value,)
+    unique = {}
+    for item in value:
+        unique.setdefault(item if key is None else key(item), item)
+    return tuple(unique.values())
+
+def _as_types(value,
+              case_sensitive):
+    if case_sensitive:
+        return _as_tuple(value)
+    return _as_tuple(value, key=str.lower)
+
+def _as_span(within):
+    if within is None:
+        return None
+    if hasattr(within, "start_node"):
+        return (within.start_node, within.end_node)
+    start, end = within
+    return (start, end)
+
+_MISSING = object()
+
+def _get_feature_check(annotation_file,
+                       name,
+                       value):
+    def get_value(annotation):
+        # read the value from the feature index when there is one, rather
+        # than decoding the annotation's features
+        feature_index = annotation_file._feature_index
+        if feature_index is not None:
+            features = feature_index.get_features(annotation)
+            if features is not None:
+                return features.get(name, _MISSING)
+        feature = annotation.features.get(name)
+        return _MISSING if feature is None else feature.value
+
+    if isinstance(value, str):
+        return lambda annotation: get_value(annotation) == value
+    values = frozenset(value)
+    return lambda annotation: get_value(annotation) in values
+
+def _get_predicate(annotation_file,
+                   types,
+                   set_names,
+                   features,
+                   span,
+                   case_sensitive):
+    # cheaper checks first, so that features are only decoded for
+    # annotations which pass all the others
+    checks = []
+    if set_names is not None:
+        set_names = frozenset(set_names)
+        checks.append(
+            lambda annotation: annotation.annotation_set.name in set_names
+        )
+    if types is not None:
+        if case_sensitive:
+            types = frozenset(types)
+            checks.append(lambda annotation: annotation.type in types)
+        else:
+            types = frozenset(x.lower() for x in types)
+            checks.append(lambda annotation: annotation.type.lower() in types)
+    if span is not None:
+        start, end = span
+        checks.append(
+            lambda annotation: (
+                start <= annotation.start_node < annotation.end_node <= end
+            )
+        )
+    for name, value in (features or {}).items():
+        checks.append(_get_feature_check(annotation_file, name, value))
+    return lambda annotation: all(check(annotation) for check in checks)
+
+def _estimate_overlapping(index,
+                          size,
+                          span,
+                          text_length):
+    # the number of annotations in *index* overlapping *span*, exact for a
+    # StaticIntervalIndex, and otherwise assuming they are spread evenly
+    start, end = span
+    if index is not None and hasattr(index, "count_overlapping"):
+        return index.count_overlapping([span])[0]
+    if start >= end:
+        return 0
+    return int(size * min(1.0, (end - start) / max(1, text_length))) + 1
+
+def _search_interval_indexes(get_indexes,
+                             span):
+    start, end = span
+    for index in get_indexes():
+        for annotation in index.search_span(start, end):
+            yield annotation
+
+def _get_feature_plan(annotation_file,
+                      features,
+                      total):
+    # look up the criterion which the fewest annotations meet
+    feature_index = annotation_file._feature_index
+    criteria = []
+    for name, value in features.items():
+        if feature_index is None:
+            # the index must first be built, charged as a scan
+            count = total
+        elif isinstance(value, str):
+            count = feature_index.count(name, value)
+        else:
+            count = sum(
+                feature_index.count(name, x)
+                for x in frozenset(value)
+            )
+        criteria.append((count, name, value))
+    count, name, value = min(criteria, key=lambda criterion: criterion[0])
+
+    def get_candidates():
+        feature_index = annotation_file.feature_index
+        if isinstance(value, str):
+            return feature_index.find(name, value)
+        return feature_index.find_any(name, value)
+
+    return QueryPlan("feature", count, get_candidates)
+
+def _get_plans(annotation_file,
+               types,
+               set_names,
+               features,
+               span,
+               case_sensitive):
+    annotations = annotation_file.annotations
+    total = len(annotations)
+    plans = []
+
+    if span is not None:
+        text_length = len(annotation_file.text)
+        if types is not None:
+            type_counts = _get_type_counts(annotation_file, types, case_sensitive)
+            cost = 0
+            for annotation_type in types:
+                key = gatenlphiltlab._get_type_key(
+                    annotation_type,
+                    case_sensitive,
+                )
+                index = annotation_file._type_interval_trees.get(key)
+                if type_counts is None:
+                    size = total
+                else:
+                    size = type_counts[annotation_type]
+                if index is None:
+                    cost += size
+                cost += _estimate_overlapping(index, size, span, text_length)
+            if type_counts is None:
+                # the annotations must first be grouped by type
+                cost += total
+            plans.append(
+                QueryPlan(
+                    "type_interval",
+                    cost,
+                    lambda: _search_interval_indexes(
+                        lambda: (
+                            annotation_file.get_type_interval_tree(
+                                annotation_type,
+                                case_sensitive=case_sensitive,
+                            )
+                            for annotation_type in types
+                        ),
+                        span,
+                    ),
+                )
+            )
+        index = annotation_file._interval_tree
+        cost = _estimate_overlapping(index, total, span, text_length)
+        if index is None:
+            cost += total
+        plans.append(
+            QueryPlan(
+                "interval",
+                cost,
+                lambda: _search_interval_indexes(
+                    lambda: [annotation_file.interval_tree],
+                    span,
+                ),
+            )
+        )
+
+    if features and annotation_file._use_feature_index:
+        plans.append(_get_feature_plan(annotation_file, features, total))
+
+    if types is not None:
+        type_counts = _get_type_counts(annotation_file, types, case_sensitive)
+        plans.append(
+            QueryPlan(
+                "type",
+                total if type_counts is None else sum(type_counts.values()),
+                lambda: itertools.chain.from_iterable(
+                    annotation_file._get_annotations_of_type(
+                        annotation_type,
+                        case_sensitive,
+                    )
+                    for annotation_type in types
+                ),
+            )
+        )
+
+    if set_names is not None:
+        annotation_sets = [
+            annotation_file.annotation_sets_dict[name]
+            for name in set_names
+            if name in annotation_file.annotation_sets_dict
+        ]
+        plans.append(
+            QueryPlan(
+                "set",
+                sum(
+                    len(annotation_set.annotations)
+                    for annotation_set in annotation_sets
+                ),
+                lambda: itertools.chain.from_iterable(
+                    annotation_set.annotations
+                    for annotation_set in annotation_sets
+                ),
+            )
+        )
+
+    plans.append(QueryPlan("scan", total, lambda: annotations))
+    return plans
+
+def _get_type_counts(annotation_file,
+                     types,
+                     case_sensitive):
+    # the number of annotations of each of *types*, if they have already
+    # been grouped by type
+    if annotation_file._annotations_by_type is None:
+        return None
+    return {
+        annotation_type: len(
+            annotation_file._get_annotations_of_type(
+                annotation_type,
+                case_sensitive,
+            )
+        )
+        for annotation_type in types
+    }
+
+def plan(annotation_file,
+         type=None,
+         set=None,
+         features=None,
+         within=None,
+         case_sensitive=True):
+    """
+    Choose how to answer a query, without running it. Takes the same
+    arguments as :func:`~gatenlphiltlab.query.select`.
+
+    The planner considers scanning every annotation, the annotations of the
+    selected sets, the annotations of the selected types, looking features
+    up in the document's :attr:`~gatenlphiltlab.AnnotationFile.feature_index`
+    if it has one, and searching the document's interval index, or its
+    interval indexes by type, and picks the one expected to examine the
+    fewest annotations. An index which has not been built yet is charged for
+    the annotations it would index. Grouping the annotations by type, or
+    building the feature index, costs no more than the scan it replaces and
+    is kept for later queries, but a one-off query on offsets scans rather
+    than builds an interval index it uses once. Build an interval index
+    beforehand, e.g. through
+    :attr:`~gatenlphiltlab.AnnotationFile.interval_tree`, for queries to use
+    it.
+
+    :rtype: :class:`~gatenlphiltlab.query.QueryPlan`
+    """
+    plans = _get_plans(
+        annotation_file,
+        _as_types(type, case_sensitive),
+        _as_tuple(set),
+        features,
+        _as_span(within),
+        case_sensitive,
+    )
+    # on a tie, prefer the more selective access path, which comes first
+    return min(
+        enumerate(plans),
+        key=lambda numbered_plan: (numbered_plan[1].cost, numbered_plan[0]),
+    )[1]
+
+def select(annotation_file,
+           type=None,
+           set=None,
+           features=None,
+           within=None,
+           case_sensitive=True):
+    """
+    Lazily iterate through the head annotations of *annotation_file* (see
+    :attr:`~gatenlphiltlab.AnnotationFile.annotations`) which meet every
+    given criterion, in no particular order. Each criterion which is
+    *None* is ignored.
+
+    :param annotation_file: The annotation file to query.
+    :type annotation_file: :class:`~gatenlphiltlab.AnnotationFile`
+
+    :param type: The annotation type, or any of several types.
+    :type type: string or iterable(string)
+
+    :param set: The name of the annotation set, or any of several names.
+    :type set: string or iterable(string)
+
+    :param features: Feature names mapped to the value which each feature must have, or to a collection of values of which it must have one.
+    :type features: dict
+
+    :param within: A (start, end) span, or an annotation, which the annotations' own spans must lie within. Annotations with empty spans never do.
+    :type within: tuple(int, int) or :class:`~gatenlphiltlab.Annotation`
+
+    :param case_sensitive: Factor case into matching annotation types.
+    :type case_sensitive: bool
+
+    :rtype: iterator of :class:`~gatenlphiltlab.Annotation`
+    """
+    types = _as_types(type, case_sensitive)
+    set_names = _as_tuple(set)
+    span = _as_span(within)
+    query_plan = plan(
+        annotation_file,
+        type=types,
+        set=set_names,
+        features=features,
+        within=span,
+        case_sensitive=case_sensitive,
+    )
+    predicate = _get_predicate(
+        annotation_file,
+        types,
+        set_names,
+        features,
+        span,
+        case_sensitive,
+    )
+    return _filter(query_plan, predicate)
+
+def _filter(query_plan,
+            predicate):
+    # candidates are only fetched once iteration starts
+    for annotation in query_plan.get_candidates():
+        if predicate(annotation):
+            yield annotation
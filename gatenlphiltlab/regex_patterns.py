@@ -25,36 +25,6 @@ regexes = (
         expression=re.compile(".*\.\w\w+.*?"),
         replacement="",
     ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
-    Regex(
-        name="file_names",
-        expression=re.compile(".*\.\w\w+.*?"),
-        replacement="",
-    ),
     Regex(
         name="speaker_tag",
         expression=re.compile("^.*?:", re.MULTILINE),
@@ -15,6 +15,9 @@ setup(
         'intervaltree>=2.1.0',
         'python-Levenshtein>=0.12.0'
     ],
+    extras_require={
+        'columnar': ['numpy'],
+    },
     python_requires='>=3',
     zip_safe=False,
 )
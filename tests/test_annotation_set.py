@@ -0,0 +1,35 @@
+import os
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def test_create_annotation_keeps_existing_annotations():
+    for static_interval_index in (False, True):
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            SAMPLE,
+            static_interval_index=static_interval_index,
+        )
+        annotation_set = annotation_file.annotation_sets_dict[
+            "annotation_set_1"
+        ]
+        existing = len(
+            gatenlphiltlab.AnnotationFile(SAMPLE).annotation_sets_dict[
+                "annotation_set_1"
+            ].annotations
+        )
+        assert existing
+        annotation = annotation_set.create_annotation(
+            "greeting",
+            16,
+            21,
+            overwrite=True,
+        )
+        assert len(annotation_set.annotations) == existing + 1
+        assert annotation in annotation_set.annotations
@@ -0,0 +1,157 @@
+import os
+import shutil
+
+import pytest
+
+import gatenlphiltlab
+from gatenlphiltlab.cache import DocumentCache
+
+
+pytest.importorskip("numpy")
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def copy_sample(tmp_path,
+                name="text1.xml"):
+    file_path = str(tmp_path / name)
+    shutil.copyfile(SAMPLE, file_path)
+    return file_path
+
+def get_contents(annotation_file):
+    return (
+        annotation_file.text,
+        [
+            annotation_set.name
+            for annotation_set in annotation_file.annotation_sets
+        ],
+        sorted(
+            (
+                annotation.annotation_set.name,
+                annotation.id,
+                annotation.type,
+                annotation.start_node,
+                annotation.end_node,
+                sorted(
+                    (name, feature.value)
+                    for name, feature in annotation.features.items()
+                ),
+            )
+            for annotation in annotation_file.annotations
+        ),
+    )
+
+def replace_in_file(file_path,
+                    old,
+                    new):
+    with open(file_path, "rb") as document_file:
+        data = document_file.read()
+    assert old in data
+    with open(file_path, "wb") as document_file:
+        document_file.write(data.replace(old, new, 1))
+
+def test_cached_document_matches_source(tmp_path):
+    file_path = copy_sample(tmp_path)
+    document_cache = DocumentCache()
+    assert document_cache.load(file_path) is None
+
+    stored_file = gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    assert os.path.exists(document_cache.get_cache_path(file_path))
+    assert document_cache.load(file_path) is not None
+
+    cached_file = gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    # a hit doesn't parse the XML up front
+    assert cached_file._tree is None
+    expected = get_contents(gatenlphiltlab.AnnotationFile(file_path))
+    assert get_contents(cached_file) == expected
+    assert get_contents(stored_file) == expected
+
+def test_touched_document_is_still_current(tmp_path):
+    file_path = copy_sample(tmp_path)
+    document_cache = DocumentCache(str(tmp_path / "cache"))
+    gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    status = os.stat(file_path)
+    os.utime(file_path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    # the content hash still matches
+    assert document_cache.load(file_path) is not None
+
+def test_changed_document_is_rejected(tmp_path):
+    file_path = copy_sample(tmp_path)
+    document_cache = DocumentCache(str(tmp_path / "cache"))
+    gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    status = os.stat(file_path)
+
+    # a change of size
+    replace_in_file(file_path, b"Hello", b"Hello there")
+    os.utime(file_path, ns=(status.st_atime_ns, status.st_mtime_ns))
+    assert document_cache.load(file_path) is None
+
+    # a change of content at the same size and a new modification time
+    shutil.copyfile(SAMPLE, file_path)
+    gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    assert document_cache.load(file_path) is not None
+    status = os.stat(file_path)
+    replace_in_file(file_path, b"Hello", b"Jello")
+    os.utime(file_path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    assert os.stat(file_path).st_size == status.st_size
+    assert document_cache.load(file_path) is None
+
+    # the changed document is parsed, and cached anew
+    annotation_file = gatenlphiltlab.AnnotationFile(
+        file_path,
+        cache=document_cache,
+    )
+    assert "Jello" in annotation_file.text
+    cached_file = gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    assert cached_file._tree is None
+    assert "Jello" in cached_file.text
+
+def test_least_recently_used_are_evicted(tmp_path):
+    file_paths = [
+        copy_sample(tmp_path, "text{}.xml".format(i))
+        for i in range(3)
+    ]
+    directory = str(tmp_path / "cache")
+    document_cache = DocumentCache(directory)
+    gatenlphiltlab.AnnotationFile(file_paths[0], cache=document_cache)
+    entry_size = os.path.getsize(document_cache.get_cache_path(file_paths[0]))
+    document_cache = DocumentCache(directory, max_bytes=2 * entry_size)
+
+    gatenlphiltlab.AnnotationFile(file_paths[1], cache=document_cache)
+    cache_paths = [
+        document_cache.get_cache_path(file_path)
+        for file_path in file_paths
+    ]
+    # the first entry was used longer ago than the second, until it is
+    # loaded again
+    os.utime(cache_paths[0], ns=(10 ** 9, 10 ** 9))
+    os.utime(cache_paths[1], ns=(2 * 10 ** 9, 2 * 10 ** 9))
+    assert document_cache.load(file_paths[0]) is not None
+
+    gatenlphiltlab.AnnotationFile(file_paths[2], cache=document_cache)
+    assert os.path.exists(cache_paths[0])
+    assert not os.path.exists(cache_paths[1])
+    assert os.path.exists(cache_paths[2])
+
+def test_corrupt_entry_is_ignored(tmp_path):
+    file_path = copy_sample(tmp_path)
+    document_cache = DocumentCache()
+    gatenlphiltlab.AnnotationFile(file_path, cache=document_cache)
+    cache_path = document_cache.get_cache_path(file_path)
+    with open(cache_path, "rb") as cache_file:
+        data = cache_file.read()
+    for corrupt_data in (data[:-3], b"not a cache file"):
+        with open(cache_path, "wb") as cache_file:
+            cache_file.write(corrupt_data)
+        assert document_cache.load(file_path) is None
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            file_path,
+            cache=document_cache,
+        )
+        assert get_contents(annotation_file) == get_contents(
+            gatenlphiltlab.AnnotationFile(file_path)
+        )
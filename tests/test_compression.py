@@ -0,0 +1,52 @@
+import os
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def get_contents(annotation_file):
+    return (
+        annotation_file.text,
+        sorted(
+            (annotation.type, annotation.start_node, annotation.end_node)
+            for annotation in annotation_file.annotations
+        ),
+    )
+
+def test_compression_not_matching_suffix(tmp_path):
+    expected = get_contents(gatenlphiltlab.AnnotationFile(SAMPLE))
+    for name, compress in (
+        ("document.xml", True),
+        ("document.xml", "xz"),
+        ("document.xml.gz", False),
+        ("document.xml.gz", "xz"),
+        ("document.xml.xz", "gzip"),
+    ):
+        file_path = str(tmp_path / name)
+        gatenlphiltlab.AnnotationFile(SAMPLE).save_changes(
+            file_path,
+            compress=compress,
+        )
+        for streaming in (False, True):
+            annotation_file = gatenlphiltlab.AnnotationFile(
+                file_path,
+                streaming=streaming,
+            )
+            assert get_contents(annotation_file) == expected
+
+def test_save_streaming_in_place_with_new_compression(tmp_path):
+    file_path = str(tmp_path / "document.xml")
+    gatenlphiltlab.AnnotationFile(SAMPLE).save_changes(file_path)
+    expected = get_contents(gatenlphiltlab.AnnotationFile(file_path))
+    annotation_file = gatenlphiltlab.AnnotationFile(file_path, streaming=True)
+    annotation_file.text
+    annotation_file.save_changes(compress=True)
+    assert get_contents(gatenlphiltlab.AnnotationFile(file_path)) == expected
+    annotation_file.save_changes()
+    assert get_contents(gatenlphiltlab.AnnotationFile(file_path)) == expected
@@ -0,0 +1,47 @@
+import operator
+import os
+
+from gatenlphiltlab.corpus import Corpus
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def count_annotations(annotation_file):
+    return len(annotation_file.annotations)
+
+def fail(annotation_file):
+    raise ValueError("failed on purpose")
+
+def test_map_reduce():
+    corpus = Corpus([SAMPLE, SAMPLE])
+    value, failures = corpus.map_reduce(
+        count_annotations,
+        operator.add,
+        processes=2,
+    )
+    assert value == 32
+    assert failures == []
+
+def test_map_reduce_all_failing():
+    corpus = Corpus([SAMPLE, SAMPLE])
+    value, failures = corpus.map_reduce(fail, operator.add, processes=2)
+    assert value is None
+    assert len(failures) == 2
+    assert all("failed on purpose" in failure.error for failure in failures)
+
+    value, failures = corpus.map_reduce(fail, operator.add, 0, processes=2)
+    assert value == 0
+    assert len(failures) == 2
+
+def test_map_reduce_empty():
+    assert Corpus([]).map_reduce(count_annotations, operator.add) == (None, [])
+    assert Corpus([]).map_reduce(
+        count_annotations,
+        operator.add,
+        initial=0,
+    ) == (0, [])
@@ -0,0 +1,112 @@
+import random
+
+from gatenlphiltlab import diff
+from gatenlphiltlab.diff import myers
+
+
+WORDS = (
+    "i you we they it that this what yeah okay so well um uh like know "
+    "think mean really just about going feel said told time thing good"
+).split()
+
+def make_transcript(length,
+                    rng):
+    lines = []
+    size = 0
+    while size < length:
+        speaker = rng.choice(("Therapist", "Client"))
+        words = [ rng.choice(WORDS) for _ in range(rng.randint(3, 25)) ]
+        line = "{}: {}.\n".format(speaker, " ".join(words))
+        lines.append(line)
+        size += len(line)
+    return "".join(lines)[:length]
+
+def edit_transcript(text,
+                    edits,
+                    rng):
+    text = list(text)
+    for _ in range(edits):
+        position = rng.randrange(len(text) + 1)
+        operation = rng.random()
+        if operation < 0.4:
+            text[position:position + rng.randint(1, 10)] = rng.choice(WORDS)
+        elif operation < 0.7:
+            text[position:position] = " " + rng.choice(WORDS)
+        else:
+            del text[position:position + rng.randint(1, 20)]
+    return "".join(text)
+
+def check_blocks(text1,
+                 text2,
+                 blocks):
+    # the invariants of difflib.SequenceMatcher.get_matching_blocks,
+    # returning the number of characters matched
+    matched = 0
+    end1 = end2 = 0
+    for i, (a, b, size) in enumerate(blocks[:-1]):
+        assert size > 0
+        assert a >= end1 and b >= end2
+        # adjacent blocks are merged
+        assert i == 0 or a > end1 or b > end2
+        assert text1[a:a + size] == text2[b:b + size]
+        end1, end2 = a + size, b + size
+        matched += size
+    assert tuple(blocks[-1]) == (len(text1), len(text2), 0)
+    return matched
+
+def get_longest_common_subsequence_length(text1,
+                                          text2):
+    lengths = [0] * (len(text2) + 1)
+    for char1 in text1:
+        previous = 0
+        for j, char2 in enumerate(text2):
+            previous, lengths[j + 1] = lengths[j + 1], (
+                previous + 1
+                if char1 == char2
+                else max(lengths[j + 1], lengths[j])
+            )
+    return lengths[-1]
+
+def test_myers_blocks_on_random_edits():
+    rng = random.Random(0)
+    for _ in range(100):
+        text1 = make_transcript(rng.randint(0, 1000), rng)
+        text2 = edit_transcript(text1, rng.randint(0, 5), rng)
+        matched = check_blocks(
+            text1,
+            text2,
+            myers.get_matching_blocks(text1, text2),
+        )
+        assert matched >= check_blocks(
+            text1,
+            text2,
+            diff.get_difflib_matching_blocks(text1, text2),
+        )
+        assert check_blocks(
+            text1,
+            text2,
+            diff.get_matching_blocks(text1, text2, "myers"),
+        ) == matched
+
+def test_myers_matches_longest_common_subsequence():
+    # within a line, the characters are compared by Myers' algorithm alone,
+    # which finds a longest common subsequence
+    rng = random.Random(0)
+    for _ in range(300):
+        text1 = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 30)))
+        text2 = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 30)))
+        assert check_blocks(
+            text1,
+            text2,
+            myers.get_matching_blocks(text1, text2),
+        ) == get_longest_common_subsequence_length(text1, text2)
+
+def test_identical_and_empty_texts():
+    text = "Client: so well um.\nTherapist: okay.\n"
+    assert myers.get_matching_blocks(text, text) == [
+        (0, 0, len(text)),
+        (len(text), len(text), 0),
+    ]
+    assert myers.get_matching_blocks("", "") == [(0, 0, 0)]
+    assert myers.get_matching_blocks(text, "") == [(len(text), 0, 0)]
+    assert myers.get_matching_blocks("", text) == [(0, len(text), 0)]
@@ -0,0 +1,215 @@
+import os
+import random
+
+import pytest
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def get_annotation(annotation_file,
+                   annotation_type,
+                   text):
+    for annotation in annotation_file.annotations:
+        if (annotation.type == annotation_type
+                and annotation_file.text[
+                    annotation.start_node:annotation.end_node
+                ] == text):
+            return annotation
+    raise KeyError((annotation_type, text))
+
+def get_offsets(annotation_file):
+    return [
+        (annotation.start_node, annotation.end_node)
+        for annotation in annotation_file.annotations
+    ]
+
+def check_document(annotation_file,
+                   tmp_path):
+    # the nodes, and the document as saved, agree with the annotations
+    text = annotation_file.text
+    assert "".join(annotation_file.text_with_nodes.itertext()) == text
+    for start, end in get_offsets(annotation_file):
+        assert 0 <= start <= end <= len(text)
+        assert start in annotation_file.nodes
+        assert end in annotation_file.nodes
+    file_path = str(tmp_path / "edited.xml")
+    annotation_file.save_changes(file_path)
+    saved_file = gatenlphiltlab.AnnotationFile(file_path)
+    assert saved_file.text == text
+    assert sorted(get_offsets(saved_file)) == sorted(
+        get_offsets(annotation_file)
+    )
+
+def test_insert_text(tmp_path):
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    greeting = get_annotation(annotation_file, "greeting", "Hello")
+    question = get_annotation(annotation_file, "question", "How have you been")
+    speaker_label = get_annotation(
+        annotation_file,
+        "speaker_label",
+        "Interlocutor_1",
+    )
+
+    # inside an annotation
+    annotation_file.insert_text(18, "-l-")
+    assert annotation_file.text[16:24] == "He-l-llo"
+    assert (greeting.start_node, greeting.end_node) == (16, 24)
+    # before an annotation
+    assert (question.start_node, question.end_node) == (26, 43)
+    # after an annotation
+    assert (speaker_label.start_node, speaker_label.end_node) == (0, 14)
+
+    # at its start, which leaves it out, and at its end, which takes it in
+    annotation_file.insert_text(16, "Oh ")
+    annotation_file.insert_text(27, " there")
+    assert annotation_file.text[19:33] == "He-l-llo there"
+    assert (greeting.start_node, greeting.end_node) == (19, 33)
+    check_document(annotation_file, tmp_path)
+
+def test_delete_range(tmp_path):
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    greeting = get_annotation(annotation_file, "greeting", "Hello")
+    punctuation = get_annotation(annotation_file, "punctuation", "!")
+    question = get_annotation(annotation_file, "question", "How have you been")
+    annotations = list(annotation_file.annotations)
+
+    # the end of the greeting, and all of the punctuation which follows it
+    annotation_file.delete_range(19, 22)
+    assert annotation_file.text[16:19] == "Hel"
+    assert (greeting.start_node, greeting.end_node) == (16, 19)
+    # an annotation whose text is all deleted is kept, with an empty span
+    # at the start of the deleted range
+    assert (punctuation.start_node, punctuation.end_node) == (19, 19)
+    assert punctuation in annotation_file.annotations
+    assert len(annotation_file.annotations) == len(annotations)
+    assert (question.start_node, question.end_node) == (20, 37)
+    assert annotation_file.text[20:37] == "How have you been"
+
+    # the start of the question
+    annotation_file.delete_range(18, 24)
+    assert (greeting.start_node, greeting.end_node) == (16, 18)
+    assert (question.start_node, question.end_node) == (18, 31)
+    assert annotation_file.text[18:31] == "have you been"
+    check_document(annotation_file, tmp_path)
+
+def test_replace_range(tmp_path):
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    greeting = get_annotation(annotation_file, "greeting", "Hello")
+    question = get_annotation(annotation_file, "question", "How have you been")
+
+    annotation_file.replace_range(17, 20, "owd")
+    assert annotation_file.text[16:21] == "Howdo"
+    assert (greeting.start_node, greeting.end_node) == (16, 21)
+    annotation_file.replace_range(16, 21, "Hi")
+    assert annotation_file.text[16:18] == "Hi"
+    assert (greeting.start_node, greeting.end_node) == (16, 18)
+    assert (question.start_node, question.end_node) == (20, 37)
+    check_document(annotation_file, tmp_path)
+
+def map_offset(offset,
+               edits):
+    # as documented: an offset within a replaced range moves to its start,
+    # and any other offset moves with the text which follows it
+    shift = 0
+    for start, end, new_text in edits:
+        if offset < end:
+            if start < offset:
+                return start + shift
+            break
+        shift += len(new_text) - (end - start)
+    return offset + shift
+
+def test_batch_matches_single_edits(tmp_path):
+    rng = random.Random(0)
+    for _ in range(20):
+        batched_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+        single_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+        bounds = sorted(
+            rng.sample(range(len(batched_file.text) + 1), 2 * rng.randint(1, 5))
+        )
+        edits = [
+            (start, end, "x" * rng.randint(0, 4))
+            for start, end in zip(bounds[::2], bounds[1::2])
+        ]
+
+        old_text = batched_file.text
+        annotations = list(batched_file.annotations)
+        expected_offsets = [
+            (map_offset(start, edits), map_offset(end, edits))
+            for start, end in get_offsets(batched_file)
+        ]
+        batched_file.apply_edits(reversed(edits))
+        assert batched_file.text == "".join(
+            old_text[previous_end:start] + new_text
+            for (start, _, new_text), previous_end in zip(
+                edits + [(len(old_text), None, "")],
+                [0] + [ end for _, end, _ in edits ],
+            )
+        )
+        assert [
+            (annotation.start_node, annotation.end_node)
+            for annotation in annotations
+        ] == expected_offsets
+        # edits from last to first leave the offsets of the rest as they are
+        for start, end, new_text in reversed(edits):
+            single_file.replace_range(start, end, new_text)
+
+        assert batched_file.text == single_file.text
+        assert sorted(get_offsets(batched_file)) == sorted(
+            get_offsets(single_file)
+        )
+        check_document(batched_file, tmp_path)
+
+def test_edits_keep_indexes_current():
+    for static_interval_index in (False, True):
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            SAMPLE,
+            static_interval_index=static_interval_index,
+        )
+        annotation_file.interval_tree
+        annotation_file.get_type_interval_tree("punctuation")
+        annotation_file.apply_edits([(0, 0, "A: "), (50, 60, ""), (95, 95, "!")])
+        for start, end in ((0, 45), (40, 100), (90, 140)):
+            expected = sorted(
+                (
+                    annotation
+                    for annotation in annotation_file.annotations
+                    if start <= annotation.start_node
+                    < annotation.end_node <= end
+                ),
+                key=id,
+            )
+            assert sorted(
+                annotation_file.select(within=(start, end)),
+                key=id,
+            ) == expected
+            assert sorted(
+                annotation_file.select(
+                    type="punctuation",
+                    within=(start, end),
+                ),
+                key=id,
+            ) == [
+                annotation
+                for annotation in expected
+                if annotation.type == "punctuation"
+            ]
+
+def test_invalid_edits():
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    text = annotation_file.text
+    for edits in (
+        [(10, 20, ""), (15, 25, "")],
+        [(20, 10, "")],
+        [(0, len(text) + 1, "")],
+    ):
+        with pytest.raises(ValueError):
+            annotation_file.apply_edits(edits)
+    assert annotation_file.text == text
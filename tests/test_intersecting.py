@@ -0,0 +1,77 @@
+import os
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def get_expected(annotation_file,
+                 annotation,
+                 annotation_type):
+    return sorted(
+        (
+            other
+            for span in annotation.spans
+            for other in annotation_file.annotations
+            if other.type.lower() == annotation_type.lower()
+            and other.start_node < other.end_node
+            and other.start_node < span.end_node
+            and span.start_node < other.end_node
+        ),
+        key=id,
+    )
+
+def check_intersecting(annotation_file):
+    for annotation in annotation_file.annotations:
+        expected = get_expected(annotation_file, annotation, "punctuation")
+        assert sorted(
+            annotation.get_intersecting_of_type("punctuation"),
+            key=id,
+        ) == expected
+        assert sorted(
+            annotation.get_intersecting_of_type(
+                "PUNCTUATION",
+                case_sensitive=False,
+            ),
+            key=id,
+        ) == expected
+
+def get_annotation_files():
+    for static_interval_index in (False, True):
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            SAMPLE,
+            static_interval_index=static_interval_index,
+        )
+        annotation_file.interval_tree
+        check_intersecting(annotation_file)
+        yield annotation_file
+
+def test_intersecting_after_text_change():
+    for annotation_file in get_annotation_files():
+        text = annotation_file.text
+        annotation_file.text = "A new first line.\n" + text[:50] + text[60:]
+        check_intersecting(annotation_file)
+
+def test_intersecting_after_edit():
+    for annotation_file in get_annotation_files():
+        annotation_file.insert_text(21, "!!")
+        check_intersecting(annotation_file)
+
+def test_intersecting_after_offsets_are_set():
+    for annotation_file in get_annotation_files():
+        punctuation = [
+            annotation
+            for annotation in annotation_file.annotations
+            if annotation.type == "punctuation"
+        ]
+        # moved past its own end, so that its span is empty in between
+        punctuation[0].start_node, punctuation[0].end_node = 100, 102
+        punctuation[1].end_node = punctuation[1].start_node
+        check_intersecting(annotation_file)
+        punctuation[1].end_node = punctuation[1].start_node + 3
+        check_intersecting(annotation_file)
@@ -0,0 +1,179 @@
+import os
+import random
+
+import pytest
+
+import gatenlphiltlab
+from gatenlphiltlab import diff
+from gatenlphiltlab import regex_patterns
+from gatenlphiltlab.normalization import normalize_files, get_normalizer
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def test_normalize_files_keeps_relative_paths(tmp_path):
+    texts = {
+        os.path.join("a", "text.txt"): "Some  text\\nhere\n",
+        os.path.join("b", "text.txt"): "Other   text\n",
+        os.path.join("b", "c", "text.txt"): "More\ttext\n",
+    }
+    input_paths = []
+    for name, text in texts.items():
+        input_path = tmp_path / "input" / name
+        input_path.parent.mkdir(parents=True, exist_ok=True)
+        input_path.write_text(text, encoding="utf-8")
+        input_paths.append(str(input_path))
+    missing_path = str(tmp_path / "input" / "a" / "missing.txt")
+    output_directory = str(tmp_path / "output")
+
+    results = {
+        result.filename: result
+        for result in normalize_files(
+            input_paths + [missing_path],
+            output_directory,
+            processes=2,
+        )
+    }
+    assert len(results) == 4
+    assert results[missing_path].error is not None
+    for input_path, (name, text) in zip(input_paths, texts.items()):
+        result = results[input_path]
+        assert result.error is None
+        assert result.value == os.path.join(output_directory, name)
+        with open(result.value, encoding="utf-8", newline="") as output_file:
+            assert output_file.read() == get_normalizer()(text)
+
+def test_normalize_files_rejects_repeated_files(tmp_path):
+    input_path = tmp_path / "text.txt"
+    input_path.write_text("text\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        normalize_files(
+            [str(input_path), str(tmp_path / "." / "text.txt")],
+            str(tmp_path / "output"),
+        )
+
+def test_tracked_offsets_through_several_stages():
+    # the words are moved by several replacements, which shorten, lengthen
+    # and drop the text around them
+    text = (
+        "Client: (so) I [think]  {laughs} it's *fine*~ really.\r\n"
+        "Therapist:   okay  /yes/\n\n\nClient: well\\ @right  \n"
+    )
+    words = ["so", "think", "it's", "fine", "really", "okay", "yes", "well"]
+    normalized_text, change_tree = gatenlphiltlab.normalize(
+        text,
+        track_offsets=True,
+    )
+    assert normalized_text == gatenlphiltlab.normalize(text)
+    offsets = []
+    end = 0
+    for word in words:
+        start = text.index(word, end)
+        end = start + len(word)
+        offsets.extend([start, end])
+    new_offsets, remapped = change_tree.remap_offsets(offsets)
+    assert all(remapped)
+    assert [
+        normalized_text[start:end]
+        for start, end in zip(new_offsets[::2], new_offsets[1::2])
+    ] == words
+
+def test_compose_matching_blocks():
+    # "abcdef" to "abdef" to "xabde"
+    assert diff.compose_matching_blocks(
+        [(0, 0, 2), (3, 2, 3), (6, 5, 0)],
+        [(0, 1, 4), (5, 5, 0)],
+    ) == [(0, 1, 2), (3, 3, 2), (6, 5, 0)]
+
+    # composed across each pass of the normalizer in turn
+    text = "Client: (so) I [think]  it's\n\n\nTherapist:   okay /yes/\n"
+    blocks = [ (0, 0, len(text)), (len(text), len(text), 0) ]
+    new_text = text
+    for regex in get_normalizer().passes:
+        old_text = new_text
+        new_text = regex.expression.sub(regex.replacement, old_text)
+        blocks = diff.compose_matching_blocks(
+            blocks,
+            diff.get_matching_blocks(old_text, new_text),
+        )
+    assert new_text == gatenlphiltlab.normalize(text)
+    assert tuple(blocks[-1]) == (len(text), len(new_text), 0)
+    end1 = end2 = 0
+    for a, b, size in blocks[:-1]:
+        assert a >= end1 and b >= end2
+        assert text[a:a + size] == new_text[b:b + size]
+        end1, end2 = a + size, b + size
+    # the replacements only take characters out, or put in ones which were
+    # already there, so all of the normalized text is matched
+    assert sum(size for _, _, size in blocks) == len(new_text)
+
+def test_align_annotations_to_normalized_text():
+    for regex_restrictions in (
+        [],
+        ["speaker_tag", "extra_newlines"],
+        ["speaker_tag", "leading_spaces", "extra_spaces", "extra_newlines"],
+    ):
+        annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+        text = annotation_file.text
+        # those annotations whose text normalizing leaves as it is
+        annotations = [
+            annotation
+            for annotation in annotation_file.annotations
+            if annotation.type
+            in ("greeting", "question", "answer", "punctuation")
+        ]
+        annotated_texts = [
+            text[annotation.start_node:annotation.end_node]
+            for annotation in annotations
+        ]
+        normalized_text, change_tree = gatenlphiltlab.normalize(
+            text,
+            regex_restrictions,
+            track_offsets=True,
+        )
+        assert normalized_text != text
+        diff.align_annotations(annotations, change_tree)
+        assert [
+            normalized_text[annotation.start_node:annotation.end_node]
+            for annotation in annotations
+        ] == annotated_texts
+
+def apply_in_turn(regexes,
+                  text):
+    for regex in regexes:
+        text = regex.expression.sub(regex.replacement, text)
+    return text
+
+def test_fused_passes_match_regexes_in_turn():
+    rng = random.Random(0)
+    characters = "ab :.~\\/*$^+@#`_=<>;()[]{}\r\n\t"
+    texts = [
+        "".join(rng.choice(characters) for _ in range(rng.randint(0, 60)))
+        for _ in range(200)
+    ]
+    texts.append(
+        "Client: (so) I [think]  {laughs} it's *fine*~ really.\r\n"
+        "Therapist:   okay  /yes/\n\n\nClient: we<>ll\\ @right  file.txt\n"
+    )
+    names = [ regex.name for regex in regex_patterns.regexes ]
+    selections = [()] + [ (name,) for name in names ] + [
+        tuple(rng.sample(names, rng.randint(2, len(names))))
+        for _ in range(30)
+    ]
+    for selection in selections:
+        normalizer = get_normalizer(selection)
+        regexes = [
+            regex
+            for regex in regex_patterns.regexes
+            if not selection or regex.name in selection
+        ]
+        assert normalizer.regexes == tuple(regexes)
+        for text in texts:
+            assert normalizer(text) == apply_in_turn(regexes, text)
+    # some of the default regexes are fused
+    assert len(get_normalizer().passes) < len(regex_patterns.regexes)
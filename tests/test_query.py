@@ -0,0 +1,166 @@
+import os
+
+import gatenlphiltlab
+from gatenlphiltlab import query
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def get_expected(annotation_file,
+                 start,
+                 end,
+                 annotation_type=None):
+    return sorted(
+        (
+            annotation
+            for annotation in annotation_file.annotations
+            if start <= annotation.start_node < annotation.end_node <= end
+            and annotation_type in (None, annotation.type)
+        ),
+        key=id,
+    )
+
+def test_select_within_interval_tree():
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    annotation_file.interval_tree
+    assert query.plan(annotation_file, within=(0, 41)).index == "interval"
+    selected = sorted(annotation_file.select(within=(0, 41)), key=id)
+    assert selected
+    assert selected == get_expected(annotation_file, 0, 41)
+
+def test_select_within_type_interval_tree():
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    annotation_file.get_type_interval_tree("punctuation")
+    assert query.plan(
+        annotation_file,
+        type="punctuation",
+        within=(0, 41),
+    ).index == "type_interval"
+    selected = sorted(
+        annotation_file.select(type="punctuation", within=(0, 41)),
+        key=id,
+    )
+    assert selected
+    assert selected == get_expected(annotation_file, 0, 41, "punctuation")
+
+def test_select_after_delete():
+    for static_interval_index in (False, True):
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            SAMPLE,
+            static_interval_index=static_interval_index,
+        )
+        annotation_file.interval_tree
+        annotation_file.get_type_interval_tree("punctuation")
+        annotation_file.get_type_interval_tree(
+            "PUNCTUATION",
+            case_sensitive=False,
+        )
+        queries = [
+            dict(type="punctuation"),
+            dict(within=(0, 41)),
+            dict(type="punctuation", within=(0, 41)),
+        ]
+        plans = [
+            query.plan(annotation_file, **kwargs).index
+            for kwargs in queries
+        ]
+        assert plans == ["type", "interval", "type_interval"]
+        deleted = list(annotation_file.select(**queries[2]))[0]
+        paragraph = list(
+            annotation_file.select(type="paragraph", within=(0, 41))
+        )[0]
+        deleted.delete()
+
+        for kwargs in queries:
+            assert deleted not in list(annotation_file.select(**kwargs))
+        assert deleted not in paragraph.get_intersecting_of_type("punctuation")
+        assert deleted not in paragraph.get_intersecting_of_type(
+            "PUNCTUATION",
+            case_sensitive=False,
+        )
+        assert all(
+            deleted not in pair
+            for pair in annotation_file.get_intersecting_pairs_of_types(
+                "paragraph",
+                "punctuation",
+            )
+        )
+
+def test_select_after_text_change():
+    for static_interval_index in (False, True):
+        annotation_file = gatenlphiltlab.AnnotationFile(
+            SAMPLE,
+            static_interval_index=static_interval_index,
+        )
+        annotation_file.interval_tree
+        annotation_file.get_type_interval_tree("punctuation")
+        text = annotation_file.text
+        annotation_file.text = "A new first line.\n" + text[:50] + text[60:]
+
+        for start, end in ((0, 41), (10, 70), (50, 150)):
+            assert sorted(
+                annotation_file.select(within=(start, end)),
+                key=id,
+            ) == get_expected(annotation_file, start, end)
+            assert sorted(
+                annotation_file.select(
+                    type="punctuation",
+                    within=(start, end),
+                ),
+                key=id,
+            ) == get_expected(annotation_file, start, end, "punctuation")
+
+def test_select_after_feature_change():
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE, feature_index=True)
+    annotation_set = annotation_file.create_annotation_set("features")
+    annotation_set.create_annotation(
+        "speaker",
+        0,
+        14,
+        feature_dict={"name": "Interlocutor_1", "role": "client"},
+    )
+    annotation_set.create_annotation(
+        "speaker",
+        43,
+        57,
+        feature_dict={"name": "Interlocutor_2", "role": "therapist"},
+    )
+    first, second = annotation_set.annotations
+    assert annotation_file.feature_index is not None
+    assert query.plan(
+        annotation_file,
+        features={"role": "client"},
+    ).index == "feature"
+
+    # a new value
+    first.features["role"].value = "therapist"
+    assert list(annotation_file.select(features={"role": "client"})) == []
+    assert sorted(
+        annotation_file.select(features={"role": "therapist"}),
+        key=id,
+    ) == sorted([first, second], key=id)
+
+    # a new name
+    feature = second.features["role"]
+    feature.name = "part"
+    assert feature.value == "therapist"
+    assert "role" not in second.features
+    assert second.features["part"] is feature
+    assert list(
+        annotation_file.select(features={"role": "therapist"})
+    ) == [first]
+    assert list(
+        annotation_file.select(features={"part": "therapist"})
+    ) == [second]
+
+    # the index agrees with the features themselves
+    for annotation in (first, second):
+        assert annotation_file.feature_index.get_features(annotation) == {
+            name: feature.value
+            for name, feature in annotation.features.items()
+        }
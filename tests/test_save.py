@@ -0,0 +1,143 @@
+import io
+import os
+import shutil
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def copy_sample(tmp_path,
+                name="text1.xml"):
+    file_path = str(tmp_path / name)
+    shutil.copyfile(SAMPLE, file_path)
+    return file_path
+
+def get_contents(annotation_file):
+    return (
+        annotation_file.text,
+        [
+            annotation_set.name
+            for annotation_set in annotation_file.annotation_sets
+        ],
+        sorted(
+            (
+                annotation.annotation_set.name,
+                annotation.id,
+                annotation.type,
+                annotation.start_node,
+                annotation.end_node,
+                sorted(
+                    (name, feature.value)
+                    for name, feature in annotation.features.items()
+                ),
+            )
+            for annotation in annotation_file.annotations
+        ),
+    )
+
+def write_tree(annotation_file,
+               pretty_print):
+    # what save_changes wrote before it serialized incrementally
+    output_file = io.BytesIO()
+    annotation_file.tree.write(
+        output_file,
+        pretty_print=pretty_print,
+        xml_declaration=True,
+        encoding=annotation_file.tree.docinfo.encoding,
+    )
+    return output_file.getvalue()
+
+def read_bytes(file_path):
+    with open(file_path, "rb") as document_file:
+        return document_file.read()
+
+def test_round_trip(tmp_path):
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    annotation_set = annotation_file.create_annotation_set("new")
+    annotation_set.create_annotation(
+        "speaker",
+        0,
+        14,
+        feature_dict={"name": "Interlocutor_1"},
+    )
+    annotation_file.annotation_sets_dict[
+        "annotation_set_1"
+    ].annotations[0].delete()
+    for pretty_print in (True, False):
+        file_path = str(tmp_path / "saved.xml")
+        annotation_file.save_changes(file_path, pretty_print=pretty_print)
+        data = read_bytes(file_path)
+        assert data.endswith(b"</GateDocument>" + b"\n" * pretty_print)
+        assert get_contents(
+            gatenlphiltlab.AnnotationFile(file_path)
+        ) == get_contents(annotation_file)
+
+def test_unchanged_document_is_written_as_tree_write_did(tmp_path):
+    # with a comment and a processing instruction either side of the root
+    file_path = str(tmp_path / "siblings.xml")
+    with open(file_path, "wb") as document_file:
+        document_file.write(
+            read_bytes(SAMPLE).replace(
+                b"<GateDocument",
+                b"<!-- before -->\n<?before?>\n<GateDocument",
+                1,
+            ) + b"<!-- after -->\n<?after?>\n"
+        )
+    for source_path in (SAMPLE, file_path):
+        for pretty_print in (True, False):
+            saved_path = str(tmp_path / "saved.xml")
+            annotation_file = gatenlphiltlab.AnnotationFile(source_path)
+            annotation_file.save_changes(saved_path, pretty_print=pretty_print)
+            assert read_bytes(saved_path) == write_tree(
+                annotation_file,
+                pretty_print,
+            )
+
+def test_save_in_place_is_atomic(tmp_path):
+    file_path = copy_sample(tmp_path)
+    os.chmod(file_path, 0o640)
+    annotation_file = gatenlphiltlab.AnnotationFile(file_path)
+    annotation_file.create_annotation_set("new").create_annotation("x", 0, 5)
+    inode = os.stat(file_path).st_ino
+    annotation_file.save_changes()
+
+    # the file is replaced rather than written over, keeping its mode, and
+    # no temporary file is left behind
+    assert os.listdir(str(tmp_path)) == ["text1.xml"]
+    assert os.stat(file_path).st_ino != inode
+    assert os.stat(file_path).st_mode & 0o777 == 0o640
+    assert get_contents(
+        gatenlphiltlab.AnnotationFile(file_path)
+    ) == get_contents(annotation_file)
+
+def test_unloaded_sets_are_copied(tmp_path):
+    file_path = copy_sample(tmp_path)
+    eager_file = gatenlphiltlab.AnnotationFile(file_path)
+    streamed_file = gatenlphiltlab.AnnotationFile(file_path, streaming=True)
+    for annotation_file in (eager_file, streamed_file):
+        annotation_set = annotation_file.annotation_sets_dict["Original markups"]
+        annotation_set.annotations[0].add_feature("checked", "yes")
+        annotation_file.create_annotation_set("new")
+    # the other two sets are left unloaded
+    assert len(streamed_file._annotation_set_ranges) == 2
+
+    eager_path = str(tmp_path / "eager.xml")
+    eager_file.save_changes(eager_path)
+    streamed_file.save_changes(str(tmp_path / "streamed.xml"))
+    assert read_bytes(str(tmp_path / "streamed.xml")) == read_bytes(eager_path)
+
+    # saved in place, the unloaded sets are found at their new byte ranges
+    streamed_file.save_changes()
+    assert read_bytes(file_path) == read_bytes(eager_path)
+    assert len(streamed_file._annotation_set_ranges) == 2
+    assert get_contents(streamed_file) == get_contents(eager_file)
+    streamed_file.save_changes()
+    assert get_contents(
+        gatenlphiltlab.AnnotationFile(file_path)
+    ) == get_contents(eager_file)
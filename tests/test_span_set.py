@@ -0,0 +1,66 @@
+import collections.abc
+import operator
+import random
+
+from gatenlphiltlab import SpanSet
+
+
+def get_random_span_sets(count):
+    rng = random.Random(0)
+    for _ in range(count):
+        yield SpanSet(
+            (start, start + rng.randint(0, 6))
+            for start in (rng.randint(0, 40) for _ in range(rng.randint(0, 5)))
+        )
+
+def test_matches_frozenset():
+    span_sets = list(get_random_span_sets(60))
+    for a in span_sets:
+        assert isinstance(a, collections.abc.Set)
+        assert a == frozenset(a) and frozenset(a) == a
+        assert hash(a) == hash(frozenset(a))
+        assert len(a) == len(frozenset(a))
+        for b in span_sets:
+            for method in (
+                "union",
+                "intersection",
+                "difference",
+                "symmetric_difference",
+                "isdisjoint",
+                "issubset",
+                "issuperset",
+            ):
+                expected = getattr(frozenset(a), method)(frozenset(b))
+                assert getattr(a, method)(b) == expected
+                assert getattr(a, method)(list(b)) == expected
+            for function in (
+                operator.or_,
+                operator.and_,
+                operator.sub,
+                operator.xor,
+                operator.eq,
+                operator.ne,
+                operator.lt,
+                operator.le,
+                operator.gt,
+                operator.ge,
+            ):
+                expected = function(frozenset(a), frozenset(b))
+                for left, right in (
+                    (a, b),
+                    (a, frozenset(b)),
+                    (frozenset(a), b),
+                ):
+                    result = function(left, right)
+                    assert result == expected
+                    if isinstance(expected, frozenset):
+                        assert isinstance(result, SpanSet)
+
+def test_membership_and_equality_of_other_values():
+    span_set = SpanSet([(1, 3)])
+    assert 1 in span_set and 1.0 in span_set
+    assert 1.5 not in span_set and "1" not in span_set
+    assert span_set == {1, 2}
+    assert span_set != {"a", "b"}
+    assert span_set != [1, 2]
+    assert {span_set: None}[frozenset({1, 2})] is None
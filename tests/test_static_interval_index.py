@@ -0,0 +1,74 @@
+import os
+import random
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def make_annotations(rng):
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    annotation_set = annotation_file.create_annotation_set("random")
+    length = len(annotation_file.text)
+    for _ in range(300):
+        start = rng.randint(0, length)
+        end = min(length, start + rng.choice((0, 1, 2, 5, 20, 80)))
+        annotation_set.create_annotation("random", start, end)
+    # nested and repeated spans as well
+    for start, end in ((10, 40), (10, 40), (12, 30), (12, 20), (0, length)):
+        annotation_set.create_annotation("random", start, end)
+    return annotation_file.annotations
+
+def get_expected(annotations,
+                 start,
+                 end):
+    return sorted(
+        (
+            annotation
+            for annotation in annotations
+            if start < end
+            and annotation.start_node < annotation.end_node
+            and annotation.start_node < end
+            and start < annotation.end_node
+        ),
+        key=id,
+    )
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    annotations = make_annotations(rng)
+    index = gatenlphiltlab.StaticIntervalIndex(annotations)
+    length = max(annotation.end_node for annotation in annotations)
+    spans = [
+        (start, start + rng.randint(-3, 60))
+        for start in (rng.randint(-10, length + 10) for _ in range(300))
+    ]
+    spans.extend([(0, length), (-5, length + 5), (7, 7), (8, 3)])
+    expected = [ get_expected(annotations, start, end) for start, end in spans ]
+
+    assert [
+        sorted(index.search_span(start, end), key=id)
+        for start, end in spans
+    ] == expected
+    assert [
+        sorted(matches, key=id)
+        for matches in index.search_spans(spans)
+    ] == expected
+    assert index.count_overlapping(spans) == [
+        len(matches)
+        for matches in expected
+    ]
+
+def test_empty_searches():
+    rng = random.Random(0)
+    index = gatenlphiltlab.StaticIntervalIndex(make_annotations(rng))
+    assert index.search_spans([]) == []
+    assert index.count_overlapping([]) == []
+    empty_index = gatenlphiltlab.StaticIntervalIndex([])
+    assert empty_index.search_spans([(0, 10)]) == [[]]
+    assert empty_index.count_overlapping([(0, 10)]) == [0]
@@ -0,0 +1,111 @@
+import io
+import os
+
+from lxml import etree
+
+import gatenlphiltlab
+
+
+SAMPLE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "sample",
+    "simplest",
+    "text1.xml",
+)
+
+def get_annotations(annotation_set):
+    return sorted(
+        (
+            annotation.id,
+            annotation.type,
+            annotation.start_node,
+            annotation.end_node,
+            sorted(
+                (name, feature.value)
+                for name, feature in annotation.features.items()
+            ),
+        )
+        for annotation in annotation_set.annotations
+    )
+
+def make_tricky_document(tmp_path):
+    # feature values which look like annotation set tags in the raw bytes
+    file_path = str(tmp_path / "tricky.xml")
+    annotation_file = gatenlphiltlab.AnnotationFile(SAMPLE)
+    annotation_set = annotation_file.create_annotation_set("tricky")
+    annotation_set.create_annotation(
+        "tag",
+        0,
+        14,
+        feature_dict={
+            "open": '<AnnotationSet Name="fake">',
+            "close": "</AnnotationSet>",
+        },
+    )
+    annotation_file.save_changes(file_path)
+    return file_path
+
+def check_ranges(file_path):
+    with open(file_path, "rb") as xml_file:
+        data = xml_file.read()
+    names = [
+        annotation_set.name
+        for annotation_set in gatenlphiltlab.AnnotationFile(
+            file_path
+        ).annotation_sets
+    ]
+    byte_ranges = list(
+        gatenlphiltlab.iter_annotation_set_ranges(io.BytesIO(data))
+    )
+    assert len(byte_ranges) == len(names)
+    for (start, end), name in zip(byte_ranges, names):
+        element = etree.fromstring(data[start:end])
+        assert element.tag == "AnnotationSet"
+        assert (element.get("Name") or "") == (name or "")
+    # tags cut off at the end of a chunk are found all the same
+    for chunk_size in (1, 7, 64):
+        assert list(
+            gatenlphiltlab.iter_annotation_set_ranges(
+                io.BytesIO(data),
+                chunk_size=chunk_size,
+            )
+        ) == byte_ranges
+
+def test_iter_annotation_set_ranges(tmp_path):
+    check_ranges(SAMPLE)
+    check_ranges(make_tricky_document(tmp_path))
+
+def check_streaming(file_path):
+    eager_file = gatenlphiltlab.AnnotationFile(file_path)
+    streamed_file = gatenlphiltlab.AnnotationFile(file_path, streaming=True)
+    names = eager_file.annotation_set_names
+
+    # before any set is loaded
+    assert streamed_file.text == eager_file.text
+    assert streamed_file.annotation_set_names == names
+    assert len(streamed_file._annotation_set_ranges) == len(names)
+
+    # once one set is accessed, only that set is loaded
+    name = names[-1]
+    assert get_annotations(
+        streamed_file.annotation_sets_dict[name]
+    ) == get_annotations(eager_file.annotation_sets_dict[name])
+    assert len(streamed_file._annotation_set_ranges) == len(names) - 1
+
+    # and then all of them
+    for name in names:
+        assert get_annotations(
+            streamed_file.annotation_sets_dict[name]
+        ) == get_annotations(eager_file.annotation_sets_dict[name])
+    assert not streamed_file._annotation_set_ranges
+    assert sorted(
+        (annotation.type, annotation.start_node, annotation.end_node)
+        for annotation in streamed_file.annotations
+    ) == sorted(
+        (annotation.type, annotation.start_node, annotation.end_node)
+        for annotation in eager_file.annotations
+    )
+
+def test_streamed_document_matches_eager(tmp_path):
+    check_streaming(SAMPLE)
+    check_streaming(make_tricky_document(tmp_path))